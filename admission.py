@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""Admission control: per-user token bucket, global LLM queue limit, message coalescing, circuit breaker."""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+# Per user: har USER_RATE_INTERVAL second me 1 message, burst USER_BURST tak
+USER_RATE_INTERVAL = float(os.environ.get("USER_RATE_INTERVAL", "3"))
+USER_BURST = int(os.environ.get("USER_BURST", "5"))
+USER_NOTICE_INTERVAL = 30  # "dheere bhai" ek user ko itne second me ek baar
+MAX_TRACKED_USERS = 50000
+
+# Global LLM gate
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_MAX_CONCURRENCY", os.environ.get("LLM_MAX_CONCURRENCY", "32")))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "8"))
+
+# Ek user ka LLM request chal raha ho tab aaye messages ek hi agle request me jud jaate hain ("0" = band)
+COALESCE_MESSAGES = os.environ.get("COALESCE_MESSAGES", "1") == "1"
+
+# Circuit breaker
+BREAKER_FAILURE_THRESHOLD = 5  # itne lagatar 5xx/network errors pe open
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "60"))
+BREAKER_QUOTA_COOLDOWN = float(os.environ.get("BREAKER_QUOTA_COOLDOWN", "300"))  # 429 pe
+
+
+class Overloaded(Exception):
+    """Queue full hai ya wait bahut lamba ho gaya."""
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "noticed_at")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.noticed_at = 0.0
+
+
+class UserRateLimiter:
+    def __init__(self, interval=USER_RATE_INTERVAL, burst=USER_BURST, max_users=MAX_TRACKED_USERS):
+        self.rate = 1.0 / interval if interval > 0 else float("inf")
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets = OrderedDict()
+
+    def allow(self, user_id):
+        """(allowed, notify) — notify True ho to user ko ek baar batao ki slow down kare."""
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = _Bucket(float(self.burst), now)
+            self._buckets[user_id] = bucket
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True, False
+        notify = now - bucket.noticed_at >= USER_NOTICE_INTERVAL
+        if notify:
+            bucket.noticed_at = now
+        return False, notify
+
+
+class CircuitBreaker:
+    """closed -> (failures / 429) -> open -> cooldown -> half_open (ek probe) -> closed."""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN,
+                 quota_cooldown=BREAKER_QUOTA_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.quota_cooldown = quota_cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self._probe_gen = 0  # har naye probe claim pe +1, purana claim naye ko release na kare
+
+    @property
+    def state(self):
+        if self.open_until == 0.0:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half_open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            self._probe_gen += 1
+            return True
+        return False
+
+    @contextmanager
+    def attempt(self):
+        """`with breaker.attempt() as allowed:` — half-open probe ka claim har exit pe settle hota hai.
+
+        Andar record_success / record_failure na hua (cache hit, API key missing, Overloaded, exception)
+        to probe chhod diya jata hai, taaki agla request dobara probe kar sake.
+        """
+        was_probe = self.state == "half_open"
+        allowed = self.allow()
+        gen = self._probe_gen if allowed and was_probe else None
+        try:
+            yield allowed
+        finally:
+            if gen is not None and self.probing and self._probe_gen == gen:
+                self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def record_failure(self, status_code=None):
+        self.probing = False
+        if status_code == 429:
+            # Quota khatam: network pe jaana hi bekaar hai
+            self.open_until = time.monotonic() + self.quota_cooldown
+            return
+        if status_code is not None and status_code < 500:
+            return
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.open_until:
+            self.open_until = time.monotonic() + self.cooldown
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency=ADMISSION_MAX_CONCURRENCY, max_queue=ADMISSION_MAX_QUEUE,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT, coalesce=COALESCE_MESSAGES):
+        self.users = UserRateLimiter()
+        self.breaker = CircuitBreaker()
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.coalesce_enabled = coalesce
+        self._semaphore = None
+        self.waiting = 0
+        self.active = 0
+        self.shed = 0
+        self.coalesced = 0
+        self._leaders = {}  # user_id -> Event, us user ka request chal raha hai (reply bhejne tak)
+        self._pending = {}  # user_id -> messages, agla leader pichle ke khatam hone ka wait kar raha hai
+
+    def allow_user(self, user_id):
+        return self.users.allow(user_id)
+
+    @asynccontextmanager
+    async def coalesce(self, user_id, message):
+        """`async with admission.coalesce(user_id, text) as messages:` — messages None matlab follower.
+
+        Leader ko un user messages ki list milti hai jo use history me daalke LLM call karni hai. Akele
+        message ko koi wait nahi. Us user ka request chal raha ho to agla message leader banke uske khatam
+        (reply store) hone ka wait karta hai; tab tak aaye baaki messages uske buffer me judte hain, taaki
+        history me pichle reply ke baad hi aayein (prompt assistant turn pe khatam na ho).
+        """
+        if not self.coalesce_enabled:
+            yield [message]
+            return
+        # Agla leader wait kar raha hai (ya abhi-abhi jaga hai): ye message usi ke buffer me
+        buffer = self._pending.get(user_id)
+        if buffer is not None:
+            buffer.append(message)
+            self.coalesced += 1
+            yield None
+            return
+        messages = [message]
+        current = self._leaders.get(user_id)
+        if current is not None:
+            self._pending[user_id] = messages
+            try:
+                await current.wait()
+            finally:
+                del self._pending[user_id]
+
+        done = asyncio.Event()
+        self._leaders[user_id] = done
+        try:
+            yield messages
+        finally:
+            del self._leaders[user_id]
+            done.set()
+
+    @asynccontextmanager
+    async def llm_slot(self):
+        """Global concurrency + queue depth limit. Queue full / timeout pe Overloaded."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            raise Overloaded("queue full")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise Overloaded("queue timeout")
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark ke liye local stand-ins: fake Telegram Bot API + fake OpenRouter (ek hi Starlette server).
+
+    python bench/fake_services.py --port 8765 --llm-latency 0.8 --llm-429-rate 0.05 --retry-after-rate 0.01
+
+Bot API:     http://127.0.0.1:PORT/bot<token>/<method>
+OpenRouter:  http://127.0.0.1:PORT/api/v1/chat/completions
+Stats:       GET /stats  (method wise call counts), POST /reset
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+LLM_REPLIES = [
+    "Aur bhai! Konsi movie dekhni hai aaj? 🎬",
+    "Ye le bhai, mast movie hai! 🎬👇\n\n🎬 *Stand by Me – Part 1*\n🔗 [Click to Download](M24)",
+    "Emotional hona hai? To ye dekh! 😢👇\n\n🎬 *Nobita's Dinosaur*\n🔗 [Click to Download](M21)",
+    "Ye wali abhi nahi hai bhai. Website check kar lo: dorebox.vercel.app",
+]
+
+
+def create_app(args):
+    calls = Counter()
+    state = {"message_id": 0}
+
+    def ok(result):
+        return JSONResponse({"ok": True, "result": result})
+
+    def message(chat_id, text):
+        state["message_id"] += 1
+        return {"message_id": state["message_id"], "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"}, "text": text or ""}
+
+    async def bot_api(request: Request):
+        method = request.path_params["method"]
+        calls[method] += 1
+        # PTB urlencoded params bhejta hai (python-multipart ki zaroorat na pade isliye khud parse)
+        body = (await request.body()).decode("utf-8")
+        if request.headers.get("content-type", "").startswith("application/json"):
+            params = json.loads(body) if body else {}
+        else:
+            params = {k: v[0] for k, v in parse_qs(body).items()}
+
+        if method == "getMe":
+            return ok({"id": 123456, "is_bot": True, "first_name": "DoreBox Bench", "username": "dorebox_bench_bot",
+                       "can_join_groups": False, "can_read_all_group_messages": False,
+                       "supports_inline_queries": False})
+        if method in ("sendMessage", "editMessageText"):
+            if args.latency_tg:
+                await asyncio.sleep(args.latency_tg)
+            if random.random() < args.retry_after_rate:
+                calls[f"{method}:429"] += 1
+                return JSONResponse({"ok": False, "error_code": 429,
+                                     "description": "Too Many Requests: retry after 1",
+                                     "parameters": {"retry_after": 1}}, status_code=429)
+            if method == "sendMessage" and random.random() < args.blocked_rate:
+                calls[f"{method}:403"] += 1
+                return JSONResponse({"ok": False, "error_code": 403,
+                                     "description": "Forbidden: bot was blocked by the user"}, status_code=403)
+            return ok(message(params.get("chat_id", 0), params.get("text")))
+        # sendChatAction, setWebhook, deleteWebhook, ...
+        return ok(True)
+
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        calls["llm"] += 1
+        await asyncio.sleep(max(0.0, random.gauss(args.llm_latency, args.llm_jitter)))
+        if random.random() < args.llm_429_rate:
+            calls["llm:429"] += 1
+            return JSONResponse({"error": {"message": "Rate limit exceeded", "code": 429}}, status_code=429)
+        reply = random.choice(LLM_REPLIES)
+
+        if payload.get("stream"):
+            async def events():
+                for word in reply.split(" "):
+                    chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    await asyncio.sleep(0.01)
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return JSONResponse({"choices": [{"message": {"role": "assistant", "content": reply}}]})
+
+    async def stats(_request):
+        return JSONResponse(dict(calls))
+
+    async def reset(_request):
+        calls.clear()
+        return JSONResponse({})
+
+    return Starlette(routes=[
+        Route("/bot{token}/{method}", bot_api, methods=["POST", "GET"]),
+        Route("/api/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/stats", stats, methods=["GET"]),
+        Route("/reset", reset, methods=["POST"]),
+    ])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Telegram + OpenRouter for benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="OpenRouter reply latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--latency-tg", type=float, default=0.0, help="Bot API send latency (s)")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0, help="sendMessage pe RetryAfter ka chance")
+    parser.add_argument("--blocked-rate", type=float, default=0.0, help="sendMessage pe 'bot blocked' ka chance")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import uvicorn
+
+    args = parse_args(argv)
+    random.seed(args.seed)
+    uvicorn.run(create_app(args), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""Offline load test: asli handlers (ai_chat_handler, start, broadcast) ko synthetic Updates se chalata hai.
+
+Telegram + OpenRouter ki jagah bench/fake_services.py (alag process), Mongo ki jagah mongomock
+(ya --mongo-uri se local mongod). Kuch bhi live service hit nahi hota.
+
+    python bench/load_test.py --scenario all --messages 2000 --concurrency 100 --llm-latency 0.8
+    python bench/load_test.py --scenario broadcast --broadcast-users 5000 --retry-after-rate 0.01 --json out.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_TOKEN = "123456:BENCH-TOKEN"
+ADMIN_ID = 1
+
+CHAT_MESSAGES = [
+    "hi", "hello bhai", "koi achhi movie suggest karo", "new movie batao", "save to gallery kyu nahi ho raha",
+    "ads kyu aate hai", "sabse emotional movie konsi hai", "doraemon ka gadget konsa best hai",
+]
+
+
+def rss_mb():
+    """Process ka current RSS (Linux /proc), warna peak RSS."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_services(args, port):
+    cmd = [sys.executable, os.path.join(ROOT, "bench", "fake_services.py"), "--port", str(port),
+           "--llm-latency", str(args.llm_latency), "--llm-jitter", str(args.llm_jitter),
+           "--llm-429-rate", str(args.llm_429_rate), "--retry-after-rate", str(args.retry_after_rate),
+           "--blocked-rate", str(args.blocked_rate), "--latency-tg", str(args.latency_tg),
+           "--seed", str(args.seed)]
+    proc = subprocess.Popen(cmd)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("fake_services start nahi hua")
+
+
+def configure_env(args, port):
+    # bot.py config import ke time padhta hai, isliye import se pehle
+    os.environ["TELEGRAM_BOT_TOKEN"] = BENCH_TOKEN
+    os.environ["OPENROUTER_API_KEY"] = "bench"
+    os.environ["ADMIN_ID"] = str(ADMIN_ID)
+    os.environ["TELEGRAM_API_BASE_URL"] = f"http://127.0.0.1:{port}/bot"
+    os.environ["LLM_STREAMING"] = "1" if args.streaming else "0"
+    os.environ.setdefault("UPDATE_CONCURRENCY", str(args.concurrency))
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    else:
+        os.environ.pop("MONGO_URI", None)
+
+
+class Driver:
+    def __init__(self, bot, application, args):
+        self.bot = bot
+        self.application = application
+        self.args = args
+        self.update_id = 0
+        self.message_id = 0
+        self.errors = 0
+        # Handler exceptions (jaise injected 403) count karo, traceback spam nahi
+        application.add_error_handler(self.on_error)
+
+    async def on_error(self, update, context):
+        self.errors += 1
+
+    def make_update(self, user_id, text):
+        from telegram import Update
+
+        self.update_id += 1
+        self.message_id += 1
+        entities = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}] if text.startswith("/") else []
+        data = {
+            "update_id": self.update_id,
+            "message": {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": f"User{user_id}"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+                "text": text,
+                "entities": entities,
+            },
+        }
+        return Update.de_json(data, self.application.bot)
+
+    async def drive(self, items):
+        """items = [(user_id, text)], --concurrency tak parallel. Har update ki latency return."""
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        latencies = []
+
+        async def one(user_id, text):
+            async with semaphore:
+                update = self.make_update(user_id, text)
+                start = time.perf_counter()
+                await self.application.process_update(update)
+                latencies.append(time.perf_counter() - start)
+
+        self.errors = 0
+        started = time.perf_counter()
+        await asyncio.gather(*(one(u, t) for u, t in items))
+        return latencies, time.perf_counter() - started
+
+
+async def fake_stats(port):
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"http://127.0.0.1:{port}/stats")).json()
+
+
+async def reset_fake(port):
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        await client.post(f"http://127.0.0.1:{port}/reset")
+
+
+def summarize(name, latencies, elapsed, rss_before, rss_after, extra=None):
+    result = {
+        "scenario": name,
+        "updates": len(latencies),
+        "seconds": round(elapsed, 3),
+        "updates_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(rss_after, 1),
+        "rss_mb_growth": round(rss_after - rss_before, 1),
+    }
+    result.update(extra or {})
+    return result
+
+
+async def scenario_start(driver, args, port):
+    await reset_fake(port)
+    items = [(100000 + i, "/start") for i in range(args.users)]
+    before = rss_mb()
+    latencies, elapsed = await driver.drive(items)
+    stats = await fake_stats(port)
+    return summarize("start", latencies, elapsed, before, rss_mb(), {"handler_errors": driver.errors,
+                                                                     "telegram_calls": stats})
+
+
+async def scenario_chat(driver, args, port):
+    bot = driver.bot
+    await reset_fake(port)
+    titles = [e.title for e in bot.catalog_store.index.entries]
+    rng = random.Random(args.seed)
+    items = []
+    for _ in range(args.messages):
+        user_id = 200000 + rng.randrange(args.users)
+        text = rng.choice(titles) if rng.random() < args.title_ratio else rng.choice(CHAT_MESSAGES)
+        items.append((user_id, text))
+    before = rss_mb()
+    latencies, elapsed = await driver.drive(items)
+    stats = await fake_stats(port)
+    return summarize("chat", latencies, elapsed, before, rss_mb(), {
+        "handler_errors": driver.errors,
+        "llm_calls": stats.get("llm", 0),
+        "llm_429": stats.get("llm:429", 0),
+        "replies_sent": stats.get("sendMessage", 0),
+        "cache_hits": bot.response_cache.hits,
+        "cache_misses": bot.response_cache.misses,
+        "coalesced": bot.admission.coalesced,
+        "shed": bot.admission.shed,
+        "conversations": len(bot.conversation_store),
+    })
+
+
+async def scenario_broadcast(driver, args, port):
+    bot = driver.bot
+    users = bot.database.users.sync
+    users.delete_many({})
+    users.insert_many([{"user_id": 300000 + i, "name": f"User{i}"} for i in range(args.broadcast_users)])
+    await reset_fake(port)
+
+    before = rss_mb()
+    started = time.perf_counter()
+    latencies, _ = await driver.drive([(ADMIN_ID, "/broadcast Naya episode aa gaya! 🎉")])
+    if bot.broadcaster.task is not None:
+        await bot.broadcaster.task
+    elapsed = time.perf_counter() - started
+    stats = await fake_stats(port)
+    sends = stats.get("sendMessage", 0)
+    return summarize("broadcast", latencies, elapsed, before, rss_mb(), {
+        "users": args.broadcast_users,
+        "send_attempts": sends,
+        "sends_per_sec": round(sends / elapsed, 1) if elapsed else 0.0,
+        "retry_after_injected": stats.get("sendMessage:429", 0),
+        "blocked_injected": stats.get("sendMessage:403", 0),
+        "users_left": users.count_documents({}),
+    })
+
+
+async def run(args, port):
+    sys.path.insert(0, ROOT)
+    import bot
+
+    bot.llm_client.base_url = f"http://127.0.0.1:{port}/api/v1/chat/completions"
+    application = bot.build_application()
+    await application.initialize()
+
+    if not args.mongo_uri:
+        import mongomock
+
+        # Asli connect ki jagah mongomock; baaki setup (broadcaster, indexes) bot ka hi chalta hai
+        async def connect():
+            bot.database.db = mongomock.MongoClient().get_database("dorebox_bot")
+            bot.database.users = bot.database.collection("users")
+        bot.database.connect = connect
+        bot.MONGO_URI = "mongomock://"
+    await bot.startup(application)
+    await bot.ensure_database(application.bot)
+    if bot.broadcaster is not None:
+        bot.broadcaster.bucket.rate = args.broadcast_rate
+        bot.broadcaster.bucket.capacity = bot.broadcaster.bucket.tokens = int(args.broadcast_rate)
+
+    driver = Driver(bot, application, args)
+    scenarios = ["start", "chat", "broadcast"] if args.scenario == "all" else [args.scenario]
+    results = []
+    try:
+        for name in scenarios:
+            fn = {"start": scenario_start, "chat": scenario_chat, "broadcast": scenario_broadcast}[name]
+            result = await fn(driver, args, port)
+            results.append(result)
+            print(json.dumps(result, ensure_ascii=False))
+    finally:
+        await bot.shutdown(application)
+        await application.shutdown()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DoreBox bot offline load test")
+    parser.add_argument("--scenario", choices=["chat", "start", "broadcast", "all"], default="all")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--title-ratio", type=float, default=0.6, help="Kitne messages seedhe title lookups hain")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--latency-tg", type=float, default=0.0)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--blocked-rate", type=float, default=0.0)
+    parser.add_argument("--broadcast-users", type=int, default=2000)
+    parser.add_argument("--broadcast-rate", type=float, default=500.0,
+                        help="Fake API pe Telegram ka 30/s limit nahi hai, engine ki capacity naapne ke liye")
+    parser.add_argument("--mongo-uri", help="Local mongod (warna mongomock)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Results is file me bhi likho")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+    port = free_port()
+    proc = start_fake_services(args, port)
+    try:
+        configure_env(args, port)
+        results = asyncio.run(run(args, port))
+    finally:
+        proc.terminate()
+        proc.wait()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
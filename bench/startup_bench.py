@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""Cold start benchmark: `import bot` ka time + naye process me pehle reply tak ka time (webhook mode).
+
+Har run ek fresh process hai (`uvicorn bot:asgi_app --factory`), Telegram + OpenRouter ki jagah
+bench/fake_services.py. Timeline process spawn se naapi jaati hai:
+
+    live         /healthz pehli baar 200
+    ready        /readyz 200 (Application initialize + start ho gaya)
+    first_reply  pehla update POST karke fake Bot API pe sendMessage aane tak
+
+    python bench/startup_bench.py --runs 5
+    python bench/startup_bench.py --mongo-uri mongodb://10.255.255.1:27017   # DB down ho to bhi reply jaldi?
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from load_test import BENCH_TOKEN, ROOT, free_port, parse_args as load_test_args, start_fake_services
+
+WEBHOOK_SECRET = "bench-secret"
+
+IMPORT_SNIPPET = (
+    "import sys, time; t = time.perf_counter(); import bot; "
+    "print(round((time.perf_counter() - t) * 1000, 1)); "
+    "print(' '.join(m for m in ('flask', 'pymongo', 'dns', 'starlette', 'uvicorn') if m in sys.modules))"
+)
+
+
+def child_env(args, fake_port, port):
+    env = dict(os.environ)
+    env.update({
+        "TELEGRAM_BOT_TOKEN": BENCH_TOKEN,
+        "OPENROUTER_API_KEY": "bench",
+        "ADMIN_ID": "1",
+        "TELEGRAM_API_BASE_URL": f"http://127.0.0.1:{fake_port}/bot",
+        "OPENROUTER_URL": f"http://127.0.0.1:{fake_port}/api/v1/chat/completions",
+        "WEBHOOK_URL": f"http://127.0.0.1:{port}",
+        "WEBHOOK_SECRET": WEBHOOK_SECRET,
+    })
+    if args.mongo_uri:
+        env["MONGO_URI"] = args.mongo_uri
+    else:
+        env.pop("MONGO_URI", None)
+    return env
+
+
+def measure_import(args, env):
+    """Fresh interpreter me `import bot` (ms) + kaunse deferred modules phir bhi load hue."""
+    times = []
+    loaded = set()
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout.splitlines()
+        times.append(float(out[0]))
+        loaded.update(out[1].split() if len(out) > 1 else [])
+    return times, sorted(loaded)
+
+
+def wait_for(client, url, deadline, ok=(200,)):
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code in ok:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} timeout")
+
+
+def make_update(text):
+    return {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": 4242, "type": "private", "first_name": "Bench"},
+            "from": {"id": 4242, "is_bot": False, "first_name": "Bench"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+            if text.startswith("/") else [],
+        },
+    }
+
+
+def measure_cold_start(args, fake_port):
+    """Ek fresh process ki timeline (ms, spawn se)."""
+    port = free_port()
+    env = child_env(args, fake_port, port)
+    base = f"http://127.0.0.1:{port}"
+    with httpx.Client(timeout=2) as client:
+        client.post(f"http://127.0.0.1:{fake_port}/reset")
+        started = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "bot:asgi_app", "--factory", "--host", "127.0.0.1",
+                                 "--port", str(port), "--log-level", "warning"], cwd=ROOT, env=env,
+                                # Bot ke logs stderr pe, stdout sirf result JSON
+                                stdout=sys.stderr)
+        try:
+            deadline = started + args.timeout
+            live = wait_for(client, f"{base}/healthz", deadline)
+            ready = wait_for(client, f"{base}/readyz", deadline)
+            posted = time.perf_counter()
+            client.post(f"{base}/telegram", json=make_update(args.message),
+                        headers={"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET})
+            while time.perf_counter() < deadline:
+                if client.get(f"http://127.0.0.1:{fake_port}/stats").json().get("sendMessage", 0):
+                    break
+                time.sleep(0.005)
+            else:
+                raise RuntimeError("reply nahi aaya")
+            replied = time.perf_counter()
+            readyz = client.get(f"{base}/readyz").json()
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    def ms(t):
+        return round((t - started) * 1000, 1)
+    return {"live_ms": ms(live), "ready_ms": ms(ready), "first_reply_ms": ms(replied),
+            "reply_after_post_ms": round((replied - posted) * 1000, 1), "readyz": readyz}
+
+
+def summary(values):
+    return {"median": round(statistics.median(values), 1), "min": round(min(values), 1),
+            "max": round(max(values), 1)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DoreBox bot cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--message", default="hi", help="Pehla update (\"/start\", title, ya LLM wala message)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake OpenRouter latency (s)")
+    parser.add_argument("--mongo-uri", help="Set ho to bot isse connect karega (background me)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Ek run ka max time (s)")
+    parser.add_argument("--json", help="Results is file me bhi likho")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake_port = free_port()
+    fake = start_fake_services(load_test_args(["--llm-latency", str(args.llm_latency), "--llm-jitter", "0"]),
+                               fake_port)
+    try:
+        import_times, loaded = measure_import(args, child_env(args, fake_port, 0))
+        runs = [measure_cold_start(args, fake_port) for _ in range(args.runs)]
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    result = {
+        "import_ms": summary(import_times),
+        "deferred_modules_loaded_on_import": loaded,
+        "live_ms": summary([r["live_ms"] for r in runs]),
+        "ready_ms": summary([r["ready_ms"] for r in runs]),
+        "first_reply_ms": summary([r["first_reply_ms"] for r in runs]),
+        "reply_after_post_ms": summary([r["reply_after_post_ms"] for r in runs]),
+        "readyz_after_reply": runs[-1]["readyz"],
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": result, "runs": runs}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
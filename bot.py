@@ -3,108 +3,111 @@
 import os
 import asyncio
 import json
-import requests
 import random
 from threading import Thread
-from flask import Flask
-from pymongo import MongoClient
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import TelegramError
+from catalog import CatalogStore, CATALOG_SOURCE, format_catalog_reply
+from llm_client import OpenRouterClient, LLMError
+from admission import AdmissionController, Overloaded
+from broadcaster import Broadcaster
+from database import Database, pending_db_calls
+from conversation_store import ConversationStore, CONVERSATION_STORE_BACKEND
+from prompt_builder import PromptBuilder
+import metrics
+import webhook_server
+from response_cache import ResponseCache, MongoCacheBackend, RESPONSE_CACHE_BACKEND, make_key, prompt_hash
 
 # --- Step 1: Configuration ---
 TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 ADMIN_ID = os.environ.get("ADMIN_ID")
 MONGO_URI = os.environ.get("MONGO_URI")
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
+# Local Bot API server (ya benchmark ka fake) use karna ho to, jaise http://127.0.0.1:8081/bot
+TELEGRAM_API_BASE_URL = os.environ.get("TELEGRAM_API_BASE_URL")
 
 MODEL_NAME = "arcee-ai/trinity-large-preview:free"
+# "1" ho to reply token-by-token Telegram message edit karke dikhega
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "0") == "1"
+STREAM_EDIT_INTERVAL = 1.0  # Telegram edit rate limit se bachne ke liye
+# Ek saath kitne updates process ho sakte hain (PTB default 1 = ek ke baad ek)
+UPDATE_CONCURRENCY = int(os.environ.get("UPDATE_CONCURRENCY", "64"))
+# "1": startup pe Mongo connect background me shuru. "0": pehli zaroorat (/start, /stats...) pe hi
+DB_CONNECT_ON_START = os.environ.get("DB_CONNECT_ON_START", "1") == "1"
 
 # --- Step 2: Database Connection ---
-client = None
-db = None
-users_collection = None
-user_histories = {}
-
-def setup_database():
-    """MongoDB se connect karne ka function."""
-    global client, db, users_collection
-    
-    if not MONGO_URI:
-        print("❌ Error: MONGO_URI environment variable missing hai!")
-        return False
+database = Database(MONGO_URI)
+conversation_store = ConversationStore()
+broadcaster = None
+
+# Setup ek hi task me hota hai; saare callers usi ka wait karte hain
+_db_setup = None
+_index_task = None
+indexes_ready = False
+
+async def create_indexes():
+    """Saare indexes ek baar, background me (reply ke raaste pe nahi)."""
+    global indexes_ready
+    try:
+        await database.create_indexes()
+        await conversation_store.create_indexes()
+        if isinstance(response_cache.backend, MongoCacheBackend):
+            await response_cache.backend.create_indexes()
+        if broadcaster is not None:
+            await broadcaster.create_indexes()
+        indexes_ready = True
+        print("✅ MongoDB indexes ready!")
+    except Exception as e:
+        print(f"⚠️ Index create error: {e}")
 
+async def setup_database(bot):
+    """MongoDB se connect karke DB wale components (cache, history, catalog, broadcaster) jodna."""
+    global broadcaster, _index_task
     try:
-        # DNS Fix for Render/Cloud
-        import dns.resolver
-        dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
-        dns.resolver.default_resolver.nameservers = ['8.8.8.8']
-        
-        client = MongoClient(MONGO_URI)
-        client.admin.command('ping') # Check connection
-        
-        db = client.get_database('dorebox_bot')
-        users_collection = db.users
-        users_collection.create_index("user_id", unique=True)
-        print("✅ MongoDB Connected Successfully!")
-        return True
+        # Ping dedicated DB thread pool me, event loop block nahi hota
+        await database.connect()
     except Exception as e:
         print(f"❌ MongoDB Connection Error: {e}")
         return False
 
-# --- Step 3: DATA SET ---
-
-MOVIES_DATA = [
-    {"title": "Doraemon: Nobita's Earth Symphony", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%3A%20Nobita%27s%20Earth%20Symphony&type=movies"},
-    {"title": "Doraemon Nobita and the Spiral City", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Nobita%20and%20the%20Spiral%20City&type=movies"},
-    {"title": "Doraemon The Movie Nobita In Jannat No 1", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20The%20Movie%20Nobita%20In%20Jannat%20No%201&type=movies"},
-    {"title": "Doraemon jadoo Mantar aur jhanoom", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20jadoo%20Mantar%20aur%20jhanoom&type=movies"},
-    {"title": "Dinosaur Yodha", "download_link": "https://dorebox.vercel.app/download.html?title=Dinosaur%20Yodha&type=movies"},
-    {"title": "Doraemon The Movie Nobita and the Underwater Adventure", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20The%20Movie%20Nobita%20and%20the%20Underwater%20Adventure&type=movies"},
-    {"title": "ICHI MERA DOST", "download_link": "https://dorebox.vercel.app/download.html?title=ICHI%20MERA%20DOST&type=movies"},
-    {"title": "Doraemon Nobita's Dorabian Nights", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Nobita%27s%20Dorabian%20Nights&type=movies"},
-    {"title": "Chronicle of the Moon", "download_link": "https://dorebox.vercel.app/download.html?title=Chronicle%20of%20the%20Moon&type=movies"},
-    {"title": "Sky Utopia", "download_link": "https://dorebox.vercel.app/download.html?title=Sky%20Utopia&type=movies"},
-    {"title": "Antarctic Adventure", "download_link": "https://dorebox.vercel.app/download.html?title=Antarctic%20Adventure&type=movies"},
-    {"title": "Little Space War", "download_link": "https://dorebox.vercel.app/download.html?title=Little%20Space%20War&type=movies"},
-    {"title": "Gadget Museum Ka Rahasya", "download_link": "https://dorebox.vercel.app/download.html?title=Gadget%20Museum%20Ka%20Rahasya&type=movies"},
-    {"title": "Doraemon: Nobita's New Dinosaur (fan Dubbed)", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%3A%20Nobita%27s%20New%20Dinosaur%20(fan%20Dubbed)&type=movies"},
-    {"title": "Space Hero", "download_link": "https://dorebox.vercel.app/download.html?title=Space%20Hero&type=movies"},
-    {"title": "Steel Troops – New Age", "download_link": "https://dorebox.vercel.app/download.html?title=Steel%20Troops%20%E2%80%93%20New%20Age&type=movies"},
-    {"title": "Three Visionary Swordsmen", "download_link": "https://dorebox.vercel.app/download.html?title=Three%20Visionary%20Swordsmen&type=movies"},
-    {"title": "Nobita In Hara Hara Planet", "download_link": "https://dorebox.vercel.app/download.html?title=Nobita%20In%20Hara%20Hara%20Planet&type=movies"},
-    {"title": "Adventure of Koya Koya", "download_link": "https://dorebox.vercel.app/download.html?title=Adventure%20of%20Koya%20Koya&type=movies"},
-    {"title": "Doraemon nobita and the Birthday of japan", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20nobita%20and%20the%20Birthday%20of%20japan&type=movies"},
-    {"title": "Nobita's Dinosaur", "download_link": "https://dorebox.vercel.app/download.html?title=Nobita%27s%20Dinosaur&type=movies"},
-    {"title": "Parallel Visit to West", "download_link": "https://dorebox.vercel.app/download.html?title=Parallel%20Visit%20to%20West&type=movies"},
-    {"title": "Legend of Sun King", "download_link": "https://dorebox.vercel.app/download.html?title=Legend%20of%20Sun%20King&type=movies"},
-    {"title": "Stand by Me – Part 1", "download_link": "https://dorebox.vercel.app/download.html?title=Stand%20by%20Me%20%E2%80%93%20Part%201&type=movies"},
-    {"title": "Stand by Me – Part 2", "download_link": "https://dorebox.vercel.app/download.html?title=Stand%20by%20Me%20%E2%80%93%20Part%202&type=movies"},
-    {"title": "Doraemon Nobita's Great Adventure in the South Seas", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Nobita%27s%20Great%20Adventure%20in%20the%20South%20Seas&type=movies"},
-    {"title": "Khilone Ki Bhul Bhulaiya", "download_link": "https://dorebox.vercel.app/download.html?title=Khilone%20Ki%20Bhul%20Bhulaiya&type=movies"},
-    {"title": "Birdopia Ka Sultan", "download_link": "https://dorebox.vercel.app/download.html?title=Birdopia%20Ka%20Sultan&type=movies"},
-    {"title": "Doraemon Nobita's Treasure Island", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Nobita%27s%20Treasure%20Island&type=movies"},
-    {"title": "Doraemon The Movie Nobita The Explorer Bow Bow", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20The%20Movie%20Nobita%20The%20Explorer%20Bow%20Bow&type=movies"},
-    {"title": "Doraemon Nobita and the Windmasters", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Nobita%20and%20the%20Windmasters&type=movies"},
-    {"title": "Doraemon Nobita and the Island of Miracle", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Nobita%20and%20the%20Island%20of%20Miracle&type=movies"},
-    {"title": "Doraemon Galaxy Super Express Hindi", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Galaxy%20Super%20Express%20Hindi&type=movies"},
-    {"title": "Doraemon Nobita And The Kingdom Of Robot Singham", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Nobita%20And%20The%20Kingdom%20Of%20Robot%20Singham&type=movies"}
-]
+    if RESPONSE_CACHE_BACKEND == "mongo":
+        response_cache.backend = MongoCacheBackend(database.collection("llm_cache"))
+    if CONVERSATION_STORE_BACKEND == "mongo":
+        conversation_store.collection = database.collection("conversations")
+    _index_task = metrics.background_task(create_indexes())
+    broadcaster = Broadcaster(bot, database.users, database.collection("broadcast_jobs"))
+    print("✅ MongoDB Connected Successfully!")
+    try:
+        if CATALOG_SOURCE == "mongo":
+            catalog_store.collection = database.collection("catalog")
+            await catalog_store.reload()
+        await broadcaster.resume()
+    except Exception as e:
+        print(f"⚠️ DB startup error: {e}")
+    # Kisi aur replica ka job crash ke baad adhoora reh gaya ho to lease khatam hone pe yahan se resume
+    broadcaster.watch()
+    return True
+
+def start_database(bot):
+    """Setup task shuru karo (chal raha ho to wahi), wait nahi karta. Pichla fail hua tha to dobara try."""
+    global _db_setup
+    if _db_setup is None or (_db_setup.done() and not _db_setup.result()):
+        _db_setup = metrics.background_task(setup_database(bot))
+    return _db_setup
+
+async def ensure_database(bot):
+    """DB chahiye to ye await karo: connected hai to True."""
+    if not MONGO_URI:
+        return False
+    # shield: handler cancel ho jaye to bhi setup chalta rahe
+    return await asyncio.shield(start_database(bot))
 
-SEASONS_DATA = [
-    {"title": "Doraemon Season 1", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Season%201&type=episodes"},
-    {"title": "Doraemon Season 2", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Season%202&type=episodes"},
-    {"title": "Doraemon Season 3", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Season%203&type=episodes"},
-    {"title": "Doraemon Season 4", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Season%204&type=episodes"},
-    {"title": "Doraemon Season 5", "download_link": "https://dorebox.vercel.app/download.html?title=Doraemon%20Season%205&type=episodes"}
-]
+# --- Step 3: DATA SET ---
 
-# Formatting Data
-ALL_CONTENT = ""
-for m in MOVIES_DATA:
-    ALL_CONTENT += f"MOVIE: {m['title']} | LINK: {m['download_link']}\n"
-for s in SEASONS_DATA:
-    ALL_CONTENT += f"SEASON: {s['title']} | LINK: {s['download_link']}\n"
+# Movies / seasons ab catalog.json (ya Mongo "catalog" collection) me hain; badlav bina restart ke load hote hain
+catalog_store = CatalogStore()
 
 # 🔥 FALLBACK REPLIES (429 Error)
 FALLBACK_REPLIES = [
@@ -166,13 +169,14 @@ FALLBACK_REPLIES = [
 ]
 
 # 🔥 BALANCED SYSTEM PROMPT (Vibe + Efficiency)
-SYSTEM_PROMPT = f"""
+# {catalog} ki jagah PromptBuilder har request pe sirf relevant entries (short IDs ke saath) daalta hai
+SYSTEM_PROMPT = """
 ROLE: You are 'DoreBox AI', a friendly Telegram Bot who loves Doraemon.
 LANGUAGE: Hinglish (Hindi + English mix).
 STYLE: Casual, Helpful, Friendly (Use "Bhai", "Dost", "Yaar").
 
 DATABASE:
-{ALL_CONTENT}
+{catalog}
 
 --- INSTRUCTIONS (FOLLOW THESE) ---
 
@@ -183,8 +187,8 @@ DATABASE:
 2. **LINK FORMATTING:**
    - Use this format ONLY: 
      🎬 *Title*
-     🔗 [Click to Download](Link)
-   - Do NOT show the raw link twice.
+     🔗 [Click to Download](ID)
+   - ID = DATABASE wala code (jaise M12 ya S3). Link khud mat banao, sirf ID likho.
 
 3. **SCENARIO HANDLING:**
    - **User says "Hi/Hello":** "Aur bhai! Konsi movie dekhni hai aaj? 🎬" (Don't use 'Sir').
@@ -196,74 +200,175 @@ DATABASE:
 4. **RESTRICTIONS:**
    - NO long lectures about who you are.
    - NO "Note:" about copyright in every message.
-   - Do NOT hallucinate links.
+   - Do NOT hallucinate links or IDs.
 
 --- END INSTRUCTIONS ---
 """
 
 # --- Step 4: AI Logic ---
-def get_ai_response(conversation_history):
+llm_client = OpenRouterClient(OPENROUTER_API_KEY, MODEL_NAME)
+response_cache = ResponseCache()
+prompt_builder = PromptBuilder(SYSTEM_PROMPT, catalog_store)
+admission = AdmissionController()
+DEGRADED_MATCH_SCORE = 0.45  # LLM down ho to isse upar wale catalog matches bhi chalenge
+
+def error_reply(e):
+    """LLMError ko user wale message me badalna."""
+    if e.status_code == 429:
+        metrics.FALLBACKS.inc(reason="quota")
+        return random.choice(FALLBACK_REPLIES)
+    elif e.status_code is not None:
+        metrics.FALLBACKS.inc(reason="server_error")
+        return f"Server Error: {e.status_code}"
+    metrics.FALLBACKS.inc(reason="network_error")
+    return f"Network Error: {str(e)}"
+
+def degraded_reply(user_message, reason):
+    """LLM available nahi: catalog me kuch mile to wo, warna fallback. (text, parse_mode)"""
+    metrics.FALLBACKS.inc(reason=reason)
+    matches = [entry for score, entry in catalog_store.index.search(user_message, limit=3) if score >= DEGRADED_MATCH_SCORE]
+    if matches:
+        return format_catalog_reply(matches), ParseMode.MARKDOWN
+    return random.choice(FALLBACK_REPLIES), None
+
+async def get_ai_response(conversation_history):
     if not OPENROUTER_API_KEY:
         return "⚠️ Error: API Key missing."
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "X-Title": "DoreBox Telegram Bot"
-    }
-    
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}] + conversation_history
-    
-    payload = {
-        "model": MODEL_NAME,
-        "messages": messages,
-        "temperature": 0.7,
-        "max_tokens": 400
-    }
+    messages = prompt_builder.build(conversation_history)
+    cache_key = make_key(conversation_history, MODEL_NAME, prompt_hash(messages[0]["content"]))
+    cached = await response_cache.get(cache_key)
+    if cached:
+        return cached
 
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        elif response.status_code == 429:
-            return random.choice(FALLBACK_REPLIES)
-        else:
-            return f"Server Error: {response.status_code}"
-            
-    except Exception as e:
-        return f"Network Error: {str(e)}"
+        reply = prompt_builder.expand_links(await llm_client.complete(messages))
+    except LLMError as e:
+        admission.breaker.record_failure(e.status_code)
+        return error_reply(e)
+    admission.breaker.record_success()
+    await response_cache.set(cache_key, reply)
+    return reply
+
+async def stream_ai_reply(update, conversation_history):
+    """Tokens aate hi reply ko edit karta rehta hai. Final text return karta hai."""
+    if not OPENROUTER_API_KEY:
+        text = "⚠️ Error: API Key missing."
+        await update.message.reply_text(text)
+        return text
+
+    messages = prompt_builder.build(conversation_history)
+    cache_key = make_key(conversation_history, MODEL_NAME, prompt_hash(messages[0]["content"]))
+    cached = await response_cache.get(cache_key)
+    if cached:
+        await update.message.reply_text(cached, disable_web_page_preview=True)
+        return cached
+
+    loop = asyncio.get_running_loop()
+    sent = None
+    text = ""
+    last_edit = 0.0
+    failed = False
+    try:
+        async for chunk in llm_client.stream(messages):
+            text += chunk
+            now = loop.time()
+            try:
+                if sent is None:
+                    sent = await update.message.reply_text(prompt_builder.expand_links(text) + " ▌",
+                                                           disable_web_page_preview=True)
+                    last_edit = now
+                elif now - last_edit >= STREAM_EDIT_INTERVAL:
+                    await sent.edit_text(prompt_builder.expand_links(text) + " ▌", disable_web_page_preview=True)
+                    last_edit = now
+            except TelegramError:
+                pass  # Ek edit miss hua to koi baat nahi, final edit sab theek kar dega
+    except LLMError as e:
+        admission.breaker.record_failure(e.status_code)
+        failed = True
+        # Aadha reply aa chuka ho to wahi rakho
+        if not text:
+            text = error_reply(e)
+
+    if not text:
+        failed = True
+        metrics.FALLBACKS.inc(reason="empty_reply")
+        text = random.choice(FALLBACK_REPLIES)
+    text = prompt_builder.expand_links(text)
+    if not failed:
+        admission.breaker.record_success()
+        await response_cache.set(cache_key, text)
+
+    if sent is None:
+        await update.message.reply_text(text, disable_web_page_preview=True)
+    else:
+        try:
+            await sent.edit_text(text, disable_web_page_preview=True)
+        except TelegramError:
+            pass
+    return text
 
 # --- Step 5: Flask App ---
-app = Flask(__name__)
+def create_flask_app(application):
+    """Polling mode ka health server. Flask bhari import hai, isliye tabhi load jab zaroorat ho."""
+    from flask import Flask, Response, jsonify
+
+    flask_app = Flask(__name__)
+
+    @flask_app.route('/')
+    def home():
+        return "DoreBox AI Bot Running (Balanced Vibe Mode)"
+
+    @flask_app.route('/healthz')
+    def healthz():
+        return jsonify(status="ok")
+
+    @flask_app.route('/readyz')
+    def readyz():
+        running = application.running
+        return jsonify(status="ready" if running else "starting", running=running, **readiness()), \
+            200 if running else 503
+
+    @flask_app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
 
-@app.route('/')
-def home():
-    return "DoreBox AI Bot Running (Balanced Vibe Mode)"
+    return flask_app
+
+def __getattr__(name):
+    # Serverless hosts (vercel.json) `bot.app` dhundhte hain: webhook ASGI app, pehli access pe hi banta hai
+    if name == "app":
+        globals()["app"] = webhook_app = asgi_app()
+        return webhook_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    # Vercel ka runtime entrypoint `dir(module)` me dhundhta hai, lazy `app` bhi dikhna chahiye
+    return sorted(set(globals()) | {"app"})
 
 # --- Step 6: Bot Handlers ---
 
+@metrics.instrument("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    user_histories[user.id] = []
-    
+    await conversation_store.reset(user.id)
+
+    # Friendly Start Message (pehle reply, DB ka kaam baad me; cold start pe connect ka wait user na kare)
+    await update.message.reply_text("Aur bhai! 👋 Doraemon ki konsi movie ya season chahiye? Bata jaldi! 🎬", parse_mode=ParseMode.MARKDOWN)
+
     try:
-        if users_collection and not users_collection.find_one({"user_id": user.id}):
-            users_collection.insert_one({"user_id": user.id, "name": user.full_name})
+        if await ensure_database(context.bot) and await database.add_user(user.id, user.full_name):
             if ADMIN_ID:
                 try:
                     await context.bot.send_message(chat_id=int(ADMIN_ID), text=f"🔔 New User: {user.full_name}")
-                except: pass
-    except Exception: pass
-
-    # Friendly Start Message
-    await update.message.reply_text("Aur bhai! 👋 Doraemon ki konsi movie ya season chahiye? Bata jaldi! 🎬", parse_mode=ParseMode.MARKDOWN)
+                except Exception as e:
+                    metrics.HANDLER_ERRORS.inc(handler="start")
+                    print(f"⚠️ Admin notify error: {e}")
+    except Exception as e:
+        metrics.HANDLER_ERRORS.inc(handler="start")
+        print(f"⚠️ User save error: {e}")
 
+@metrics.instrument("ai_chat_handler")
 async def ai_chat_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     user_message = update.message.text
@@ -271,73 +376,191 @@ async def ai_chat_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if user_message.startswith('/'):
         return
 
-    if user_id not in user_histories: user_histories[user_id] = []
-    user_histories[user_id].append({"role": "user", "content": user_message})
-    
-    if len(user_histories[user_id]) > 10: user_histories[user_id] = user_histories[user_id][-10:]
-    
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-    
-    loop = asyncio.get_event_loop()
-    ai_reply = await loop.run_in_executor(None, get_ai_response, user_histories[user_id])
-    
-    user_histories[user_id].append({"role": "assistant", "content": ai_reply})
-    
-    await update.message.reply_text(ai_reply, disable_web_page_preview=True) 
+    # Spam karne wale user ko yahi rok do, baaki sab ke liye latency bachi rahe
+    allowed, notify = admission.allow_user(user_id)
+    if not allowed:
+        if notify:
+            await update.message.reply_text("Thoda dheere bhai! 🐢 Ek-ek karke message bhejo.")
+        return
+
+    # Seedha title maanga hai to index se jawab, LLM call ki zaroorat nahi
+    matches = catalog_store.index.lookup(user_message)
+    if matches:
+        metrics.CATALOG_ANSWERS.inc()
+        catalog_reply = format_catalog_reply(matches)
+        await conversation_store.append(user_id, "user", user_message)
+        await conversation_store.append(user_id, "assistant", catalog_reply)
+        await update.message.reply_text(catalog_reply, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True)
+        return
+
+    # User ka request chal raha ho to naye messages agle ek request me judte hain (akela message wait nahi karta).
+    # History me tabhi likhte hain jab pichla reply store ho chuka ho, warna order ulta ho jaata hai
+    async with admission.coalesce(user_id, user_message) as messages:
+        if messages is None:
+            return
+        for text in messages:
+            await conversation_store.append(user_id, "user", text)
+
+        # Provider down / quota khatam: network pe jaaye bina degrade.
+        # Half-open probe ka claim `with` se nikalte hi settle hota hai (cache hit / Overloaded pe bhi)
+        with admission.breaker.attempt() as allowed:
+            if not allowed:
+                reply, parse_mode = degraded_reply(user_message, "breaker_open")
+                await conversation_store.append(user_id, "assistant", reply)
+                await update.message.reply_text(reply, parse_mode=parse_mode, disable_web_page_preview=True)
+                return
+
+            await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+            history = await conversation_store.get_history(user_id)
+
+            try:
+                async with admission.llm_slot():
+                    if LLM_STREAMING:
+                        ai_reply = await stream_ai_reply(update, history)
+                        await conversation_store.append(user_id, "assistant", ai_reply)
+                        return
+
+                    ai_reply = await get_ai_response(history)
+            except Overloaded:
+                reply, parse_mode = degraded_reply(user_message, "overloaded")
+                await conversation_store.append(user_id, "assistant", reply)
+                await update.message.reply_text(reply, parse_mode=parse_mode, disable_web_page_preview=True)
+                return
+
+        await conversation_store.append(user_id, "assistant", ai_reply)
+
+        await update.message.reply_text(ai_reply, disable_web_page_preview=True)
 
 # --- Admin Commands ---
+@metrics.instrument("stats")
 async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not ADMIN_ID or str(update.effective_user.id) != str(ADMIN_ID): return
-    if users_collection is None:
+    if not await ensure_database(context.bot):
         await update.message.reply_text("❌ DB Not Connected")
         return
     try:
-        count = users_collection.count_documents({})
-        await update.message.reply_text(f"📊 Total Users: {count}")
+        count = await database.user_count()
+        index = catalog_store.index
+        await update.message.reply_text(f"📊 Total Users: {count}\n{response_cache.stats()}\n"
+                                        f"📚 Catalog: v{index.version}, {len(index.entries)} entries")
     except Exception as e:
+        metrics.HANDLER_ERRORS.inc(handler="stats")
         await update.message.reply_text(f"❌ DB Error: {e}")
 
+@metrics.instrument("broadcast")
 async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not ADMIN_ID or str(update.effective_user.id) != str(ADMIN_ID): return
     msg = " ".join(context.args)
     if not msg: 
         await update.message.reply_text("Message empty hai!")
         return
-    if users_collection is None:
+    if not await ensure_database(context.bot) or broadcaster is None:
         await update.message.reply_text("❌ DB Not Connected")
         return
     try:
-        users = users_collection.find({}, {"user_id": 1})
-        sent_count = 0
-        for user in users:
-            try:
-                await context.bot.send_message(chat_id=user["user_id"], text=msg)
-                sent_count += 1
-                await asyncio.sleep(0.05)
-            except: pass
-        await update.message.reply_text(f"✅ Broadcast Sent to {sent_count} users.")
+        # Job background me chalta hai, handler turant free ho jata hai
+        job = await broadcaster.start(msg, update.effective_chat.id)
+        if job is None:
+            await update.message.reply_text("⏳ Ek broadcast pehle se chal raha hai, khatam hone do!")
+        else:
+            await update.message.reply_text(f"🚀 Broadcast shuru! ~{job['total']} users. Progress yahin update hoga.")
     except Exception as e:
+        metrics.HANDLER_ERRORS.inc(handler="broadcast")
         await update.message.reply_text(f"❌ Broadcast Error: {e}")
 
+@metrics.instrument("reset")
 async def clear_memory(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    user_histories[user_id] = []
+    await conversation_store.reset(user_id)
     await update.message.reply_text("🧹 Memory Cleared! Fresh start karte hain.")
 
 # --- Main ---
-def main():
-    if not TOKEN:
-        print("❌ Error: Bot Token Missing")
-        return
-    setup_database()
-    port = int(os.environ.get('PORT', 8080))
-    Thread(target=lambda: app.run(host='0.0.0.0', port=port, debug=False)).start()
-    application = Application.builder().token(TOKEN).build()
+async def startup(application):
+    # Yahan kuch bhi network pe wait nahi karta, taaki pehla update turant process ho
+    conversation_store.start()
+    catalog_store.start()
+    if not MONGO_URI:
+        print("❌ Error: MONGO_URI environment variable missing hai!")
+    elif DB_CONNECT_ON_START:
+        start_database(application.bot)
+
+def readiness():
+    """/readyz ke liye DB / index / catalog ki state. Ready hone ki shart sirf Application running hai."""
+    if not MONGO_URI:
+        db_state = "disabled"
+    elif database.connected:
+        db_state = "connected"
+    elif _db_setup is None:
+        db_state = "idle"  # lazy: abhi tak zaroorat nahi padi
+    elif not _db_setup.done():
+        db_state = "connecting"
+    else:
+        db_state = "down"
+    return {"database": db_state, "indexes": indexes_ready, "catalog_version": catalog_store.index.version}
+
+async def shutdown(application):
+    for task in (_db_setup, _index_task):
+        if task is not None and not task.done():
+            task.cancel()
+    if broadcaster is not None:
+        await broadcaster.stop()
+    await llm_client.close()
+    await conversation_store.close()
+    await catalog_store.close()
+
+def register_gauges(application):
+    gauge = metrics.REGISTRY.gauge
+    gauge("dorebox_update_queue_size", "PTB update queue me pending updates", application.update_queue.qsize)
+    gauge("dorebox_conversations", "Memory me active conversations (user_histories)", lambda: len(conversation_store))
+    gauge("dorebox_conversation_bytes", "Conversation store ka estimated size", lambda: conversation_store.nbytes)
+    gauge("dorebox_llm_in_flight", "OpenRouter pe chal rahi requests", lambda: llm_client.in_flight)
+    gauge("dorebox_admission_waiting", "LLM slot ke liye queue me wait", lambda: admission.waiting)
+    gauge("dorebox_admission_shed_total", "Queue full/timeout se degrade hui requests", lambda: admission.shed, "counter")
+    gauge("dorebox_admission_coalesced_total", "Dusre message me merge hue messages",
+          lambda: admission.coalesced, "counter")
+    gauge("dorebox_breaker_open", "Circuit breaker open (1) / closed (0)",
+          lambda: 0 if admission.breaker.state == "closed" else 1)
+    gauge("dorebox_catalog_entries", "Current catalog snapshot me entries", lambda: len(catalog_store.index.entries))
+    gauge("dorebox_catalog_version", "Catalog snapshot version (har reload pe +1)", lambda: catalog_store.index.version)
+    gauge("dorebox_db_executor_pending", "Mongo executor me queued + running calls", pending_db_calls)
+    gauge("dorebox_response_cache_hits_total", "LLM response cache hits", lambda: response_cache.hits, "counter")
+    gauge("dorebox_response_cache_misses_total", "LLM response cache misses", lambda: response_cache.misses, "counter")
+
+def build_application():
+    builder = (Application.builder().token(TOKEN)
+               .request(metrics.InstrumentedRequest(connection_pool_size=UPDATE_CONCURRENCY + 32))
+               .concurrent_updates(UPDATE_CONCURRENCY)
+               .post_init(startup).post_shutdown(shutdown))
+    if TELEGRAM_API_BASE_URL:
+        builder = builder.base_url(TELEGRAM_API_BASE_URL)
+    application = builder.build()
+    register_gauges(application)
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("stats", stats))
     application.add_handler(CommandHandler("broadcast", broadcast))
     application.add_handler(CommandHandler("reset", clear_memory))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, ai_chat_handler))
+    return application
+
+def asgi_app():
+    """ASGI hosts ke liye factory: `uvicorn --factory bot:asgi_app` (serverless pe `bot.app`)."""
+    return webhook_server.create_app(build_application(), readiness)
+
+def main():
+    if not TOKEN:
+        print("❌ Error: Bot Token Missing")
+        return
+    port = int(os.environ.get('PORT', 8080))
+    application = build_application()
+
+    # Webhook mode: ek hi async server updates + health + metrics sambhalta hai
+    if webhook_server.WEBHOOK_URL:
+        print("✅ DoreBox Bot Started (Webhook Mode)...")
+        webhook_server.run(application, port, readiness)
+        return
+
+    flask_app = create_flask_app(application)
+    Thread(target=lambda: flask_app.run(host='0.0.0.0', port=port, debug=False)).start()
     print("✅ DoreBox Bot Started (Balanced Vibe)...")
     application.run_polling()
 
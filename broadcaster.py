@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+"""Broadcast engine: batches me users, token-bucket rate limit, RetryAfter handling, resumable jobs."""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+import metrics
+
+# Telegram ka global limit ~30 msg/s hai, thoda neeche rakhte hain
+BROADCAST_RATE = float(os.environ.get("BROADCAST_RATE", "25"))
+BROADCAST_BURST = int(os.environ.get("BROADCAST_BURST", "25"))
+BROADCAST_BATCH_SIZE = int(os.environ.get("BROADCAST_BATCH_SIZE", "200"))
+BROADCAST_CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", "20"))
+BROADCAST_MAX_RETRIES = 3
+PER_CHAT_INTERVAL = 1.0  # ek chat me 1 msg/s
+PROGRESS_INTERVAL = 5.0
+# Job ka owner har batch pe lease badhata hai; owner mar jaye to lease khatam hone ke baad koi aur resume kare
+BROADCAST_LEASE_SECONDS = float(os.environ.get("BROADCAST_LEASE_SECONDS", "120"))
+
+# Ye errors matlab user ne bot block kar diya / account delete ho gaya
+DEAD_CHAT_ERRORS = ("chat not found", "user is deactivated", "bot was blocked", "peer_id_invalid")
+
+
+class LeaseLost(Exception):
+    """Job ki lease kisi aur replica ne le li (hum atak gaye the), ab hum nahi bhejenge."""
+
+
+def _seconds(delay):
+    # PTB ke naye versions me retry_after timedelta bhi ho sakta hai
+    return delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """RetryAfter aaya to sabke liye ruk jao."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Broadcaster:
+    """Saare replicas me ek time pe ek job. Progress Mongo (broadcast_jobs) me save hoti hai taaki restart ke baad resume ho.
+
+    Job ka `owner` + `lease_until` hota hai: sirf owner bhejta hai, aur resume sirf expired / chhodi hui lease wala
+    job claim karta hai (atomic find_one_and_update), isliye do replicas ek hi job dobara nahi bhejte. Shutdown pe
+    lease chhod dete hain; crash hua to `watch()` lease khatam hone ke baad kisi bhi replica se resume karwata hai.
+    """
+
+    def __init__(self, bot, users_collection, jobs_collection, rate=BROADCAST_RATE, burst=BROADCAST_BURST,
+                 batch_size=BROADCAST_BATCH_SIZE, concurrency=BROADCAST_CONCURRENCY):
+        self.bot = bot
+        self.users = users_collection
+        self.jobs = jobs_collection
+        self.bucket = TokenBucket(rate, burst)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._last_sent = {}  # chat_id -> monotonic time (sirf retries ke liye kaam aata hai)
+        self.task = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = BROADCAST_LEASE_SECONDS
+        self._watcher = None
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    # --- Mongo helpers (users / jobs dono database.AsyncCollection hain) ---
+    async def create_indexes(self):
+        """`active` sirf running job pe hota hai: unique partial index = poore cluster me ek hi running job."""
+        await self.jobs.create_index("active", unique=True, partialFilterExpression={"active": True})
+
+    def _lease_until(self):
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    async def _create_job(self, text, admin_chat_id):
+        """Naya job insert. Kisi aur replica pe job chal raha ho to None."""
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.now(timezone.utc)
+        job = {
+            "text": text,
+            "status": "running",
+            "active": True,
+            "owner": self.owner,
+            "lease_until": self._lease_until(),
+            "admin_chat_id": admin_chat_id,
+            "progress_message_id": None,
+            "last_user_id": None,
+            "total": await self.users.estimated_document_count(),
+            "sent": 0, "failed": 0, "blocked": 0,
+            "started_at": now, "updated_at": now,
+        }
+        try:
+            job["_id"] = (await self.jobs.insert_one(job)).inserted_id
+        except DuplicateKeyError:
+            return None
+        return job
+
+    async def _claim_orphan(self):
+        """Running job jiski lease khatam ho gayi (owner mar gaya) use atomically apna banao."""
+        from pymongo import ReturnDocument
+
+        now = datetime.now(timezone.utc)
+        return await self.jobs.find_one_and_update(
+            {"status": "running", "$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}]},
+            {"$set": {"owner": self.owner, "lease_until": self._lease_until(), "active": True}},
+            sort=[("started_at", -1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _save(self, job, pruned):
+        if pruned:
+            await self.users.delete_many({"user_id": {"$in": pruned}})
+        fields = ("status", "progress_message_id", "last_user_id", "sent", "failed", "blocked")
+        update = {"$set": {k: job[k] for k in fields}}
+        update["$set"]["updated_at"] = datetime.now(timezone.utc)
+        if job["status"] == "running":
+            # Har batch pe lease renew
+            update["$set"]["lease_until"] = self._lease_until()
+        else:
+            update["$unset"] = {"active": "", "lease_until": ""}
+        result = await self.jobs.update_one({"_id": job["_id"], "owner": self.owner}, update)
+        if result.matched_count == 0:
+            raise LeaseLost(str(job["_id"]))
+
+    async def _release(self, job):
+        """Lease chhod do (job "running" hi rehta hai) taaki restart / koi aur replica turant resume kar sake."""
+        try:
+            await self.jobs.update_one({"_id": job["_id"], "owner": self.owner}, {"$set": {"lease_until": None}})
+        except Exception as e:
+            print(f"⚠️ Broadcast lease release error: {e}")
+
+    async def _next_batch(self, last_user_id):
+        query = {} if last_user_id is None else {"user_id": {"$gt": last_user_id}}
+        docs = await self.users.find(query, {"user_id": 1, "_id": 0}, sort=[("user_id", 1)], limit=self.batch_size)
+        return [doc["user_id"] for doc in docs]
+
+    # --- Sending ---
+    async def _send_one(self, chat_id, text):
+        """'sent' | 'blocked' | 'failed'"""
+        for _ in range(BROADCAST_MAX_RETRIES + 1):
+            last = self._last_sent.get(chat_id)
+            if last is not None:
+                wait = PER_CHAT_INTERVAL - (time.monotonic() - last)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            await self.bucket.acquire()
+            try:
+                self._last_sent[chat_id] = time.monotonic()
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                return "sent"
+            except RetryAfter as e:
+                self.bucket.pause(_seconds(e.retry_after))
+            except Forbidden:
+                return "blocked"
+            except BadRequest as e:
+                if any(msg in str(e).lower() for msg in DEAD_CHAT_ERRORS):
+                    return "blocked"
+                print(f"⚠️ Broadcast BadRequest ({chat_id}): {e}")
+                return "failed"
+            except TelegramError as e:
+                print(f"⚠️ Broadcast error ({chat_id}): {e}")
+                return "failed"
+        return "failed"
+
+    async def _report(self, job, rate, final=False):
+        done = job["sent"] + job["failed"] + job["blocked"]
+        head = "✅ Broadcast Complete!" if final else "📣 Broadcast chal raha hai..."
+        text = (f"{head}\n"
+                f"📊 {done}/{job['total']} users\n"
+                f"✅ Sent: {job['sent']} | 🚫 Blocked: {job['blocked']} | ❌ Failed: {job['failed']}\n"
+                f"⚡ {rate:.1f} msg/s")
+        try:
+            if job["progress_message_id"] is None:
+                msg = await self.bot.send_message(chat_id=job["admin_chat_id"], text=text)
+                job["progress_message_id"] = msg.message_id
+            else:
+                await self.bot.edit_message_text(chat_id=job["admin_chat_id"],
+                                                 message_id=job["progress_message_id"], text=text)
+        except TelegramError as e:
+            print(f"⚠️ Broadcast progress update error: {e}")
+
+    async def _run(self, job):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic()
+        done_at_start = job["sent"] + job["failed"] + job["blocked"]
+        last_report = 0.0
+
+        async def send(chat_id):
+            async with semaphore:
+                return chat_id, await self._send_one(chat_id, job["text"])
+
+        try:
+            while True:
+                batch = await self._next_batch(job["last_user_id"])
+                if not batch:
+                    break
+                pruned = []
+                for chat_id, result in await asyncio.gather(*(send(c) for c in batch)):
+                    job[result] += 1
+                    if result == "blocked":
+                        pruned.append(chat_id)
+                job["last_user_id"] = batch[-1]
+                self._last_sent.clear()
+                await self._save(job, pruned)
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    done = job["sent"] + job["failed"] + job["blocked"] - done_at_start
+                    await self._report(job, done / max(now - started, 1e-6))
+                    last_report = now
+
+            job["status"] = "done"
+            await self._save(job, [])
+            done = job["sent"] + job["failed"] + job["blocked"] - done_at_start
+            await self._report(job, done / max(time.monotonic() - started, 1e-6), final=True)
+        except asyncio.CancelledError:
+            # Shutdown: job "running" hi rehta hai, lease chhodte hain to restart pe turant resume hoga
+            await self._release(job)
+            raise
+        except LeaseLost:
+            print(f"⚠️ Broadcast {job['_id']} ki lease kisi aur replica ke paas hai, yahan band")
+        except Exception as e:
+            print(f"❌ Broadcast job crash: {e}")
+            job["status"] = "error"
+            await self._save(job, [])
+            await self._report(job, 0.0)
+
+    async def start(self, text, admin_chat_id):
+        """Naya job shuru karo. Kahin bhi (kisi bhi replica pe) job chal raha ho to None."""
+        if self.running:
+            return None
+        # Mare hue replica ka adhoora job pehle (wo bhi "chal raha" hai)
+        if await self.resume() is not None:
+            return None
+        job = await self._create_job(text, admin_chat_id)
+        if job is None:
+            return None
+        self.task = metrics.background_task(self._run(job))
+        return job
+
+    async def resume(self):
+        """Adhoora job (status=running) jiski lease expire ho gayi ho, claim karke wahi se continue karo."""
+        if self.running:
+            return None
+        job = await self._claim_orphan()
+        if not job:
+            return None
+        print(f"🔁 Resuming broadcast {job['_id']} after user_id {job['last_user_id']}")
+        self.task = metrics.background_task(self._run(job))
+        return job
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                await self.resume()
+            except Exception as e:
+                print(f"⚠️ Broadcast resume error: {e}")
+
+    def watch(self):
+        """Background loop: har lease_seconds pe crash hue replica ka adhoora job claim karne ki koshish."""
+        if self._watcher is None:
+            self._watcher = metrics.background_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        if self.running:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
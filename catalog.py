@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+
+"""Local catalog search: title lookups ka jawab bina LLM call ke."""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import unicodedata
+from typing import NamedTuple
+
+# "file" (catalog.json) ya "mongo" ("catalog" collection, khaali ho to file se seed hota hai)
+CATALOG_SOURCE = os.environ.get("CATALOG_SOURCE", "file")
+CATALOG_PATH = os.environ.get("CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json"))
+# Itne second me ek baar source check, badla ho to reload (0 = watch band)
+CATALOG_POLL_INTERVAL = float(os.environ.get("CATALOG_POLL_INTERVAL", "10"))
+
+# Score (0-1) jiske upar match ko "pakka" maana jayega
+CATALOG_MATCH_THRESHOLD = float(os.environ.get("CATALOG_MATCH_THRESHOLD", "0.72"))
+# Top match doosre se itna aage ho tabhi single answer, warna sab tied matches
+CATALOG_MATCH_MARGIN = 0.12
+# Ek reply me max kitne tied titles bhejne hain (jaise Stand by Me Part 1 + 2)
+CATALOG_MAX_TIED = 3
+# Fuzzy (trigram) similarity ka minimum, isse kam ho to token match nahi maana
+FUZZY_MIN_SIMILARITY = 0.45
+
+# Hinglish filler words jo title ka hissa nahi hote
+STOPWORDS = {
+    "a", "an", "the", "of", "and", "in", "to", "for", "me", "my", "is",
+    "ka", "ki", "ke", "ko", "se", "aur", "hai", "h", "he", "hain", "wala", "wali", "wale",
+    "movie", "movies", "film", "picture", "download", "link", "links", "send", "bhej", "bhejo",
+    "do", "de", "dedo", "dena", "chahiye", "chaiye", "please", "pls", "plz", "bhai", "yaar",
+    "dost", "bro", "batao", "bata", "dikhao", "dekhni", "dekhna", "hindi", "full", "episode",
+    "episodes", "doraemon",
+}
+
+# Title ke andar ke words jo query me stopword hain par match me madad karte hain
+TITLE_KEEP = {"me", "in", "and", "of", "the", "doraemon"}
+
+# "part do", "season teen" jaise number words (sirf part/season ke baad)
+NUMBER_WORDS = {
+    "ek": "1", "one": "1", "do": "2", "two": "2", "teen": "3", "three": "3",
+    "char": "4", "chaar": "4", "four": "4", "paanch": "5", "panch": "5", "five": "5",
+}
+
+# Hinglish / short spellings ko title ki spelling pe map karna
+ALIASES = {
+    "dino": "dinosaur",
+    "dinasor": "dinosaur",
+    "dinosor": "dinosaur",
+    "dainasor": "dinosaur",
+    "nobitas": "nobita",
+    "nobeta": "nobita",
+    "doremon": "doraemon",
+    "doraemona": "doraemon",
+    "jadu": "jadoo",
+    "mantra": "mantar",
+    "pt": "part",
+    "s": "season",
+    "sesion": "season",
+    "sason": "season",
+}
+
+CATALOG_HYPE_LINES = [
+    "Ye le bhai, mast movie hai! 🎬👇",
+    "Mil gaya dost! Enjoy karo 🍿👇",
+    "Ye rahi tumhari demand, seedha download karo! 🚀👇",
+    "Aur bhai, ye dekh! Full paisa vasool 🔥👇",
+    "Lo yaar, ready hai tumhare liye 😎👇",
+]
+
+
+def normalize_text(text):
+    """Text ko lowercase ASCII words me todna (accents, dashes, 's hata ke)."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    text = text.lower().replace("'s", "").replace("'", "")
+    return re.findall(r"[a-z]+|\d+", text)
+
+
+def _expand_tokens(words):
+    tokens = []
+    prev = None
+    for word in words:
+        if prev in ("part", "season") and word in NUMBER_WORDS:
+            tokens.append(NUMBER_WORDS[word])
+        elif word not in STOPWORDS:
+            tokens.append(ALIASES.get(word, word))
+        prev = ALIASES.get(word, word)
+    return tokens
+
+
+def query_tokens(text):
+    """User message se searchable tokens (stopwords hata ke)."""
+    return _expand_tokens(normalize_text(text))
+
+
+def title_tokens(title):
+    words = [w for w in normalize_text(title) if w not in STOPWORDS or w in TITLE_KEEP]
+    return [ALIASES.get(w, w) for w in words]
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(a, b):
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+
+class CatalogEntry(NamedTuple):
+    """Ek catalog item. Tuple hai, isliye chhota + immutable (snapshots ke beech share hota hai)."""
+    id: str  # chhota stable code (M12 / S3), prompt me lambe URL ki jagah use hota hai
+    kind: str  # "movie" / "season"
+    title: str
+    download_link: str
+
+
+KIND_PREFIX = {"movie": "M", "season": "S"}
+
+
+def parse_catalog(data):
+    """catalog.json ({"movies": [...], "seasons": [...]}) se CatalogEntry list.
+
+    "id" na ho to us kind ke sabse bade number ke baad wala milta hai (hataye gaye IDs dobara use nahi
+    hote), isliye naye items purane IDs nahi badalte.
+    """
+    entries = []
+    for kind, key in (("movie", "movies"), ("season", "seasons")):
+        prefix = KIND_PREFIX[kind]
+        items = data.get(key, [])
+        numbers = [int(item["id"][1:]) for item in items if str(item.get("id", ""))[1:].isdigit()]
+        next_n = max(numbers, default=0) + 1
+        for item in items:
+            entry_id = item.get("id")
+            if not entry_id:
+                entry_id = f"{prefix}{next_n}"
+                next_n += 1
+            entries.append(CatalogEntry(entry_id, kind, item["title"], item["download_link"]))
+    ids = [e.id for e in entries]
+    if len(ids) != len(set(ids)):
+        raise ValueError("catalog me duplicate IDs hain")
+    return entries
+
+
+def prompt_line(entry):
+    return f"{'MOVIE' if entry.kind == 'movie' else 'SEASON'}: {entry.title} | ID: {entry.id}"
+
+
+class CatalogIndex:
+    """Catalog ka ek immutable snapshot: inverted index + trigram fuzzy search + prompt lines.
+
+    Reload pe `updated()` naya snapshot banata hai jisme sirf badle hue entries dobara index hote hain;
+    baaki sets / tokens / prompt lines purane snapshot se share hote hain (copy-on-write).
+    """
+
+    def __init__(self, entries, version=1, previous=None):
+        self.version = version
+        self.entries = tuple(entries)
+        self.by_id = {e.id: e for e in self.entries}
+        self.changed = 0  # pichle snapshot ke muqable kitne entries dobara index hue
+        self._build(previous)
+
+    def _build(self, previous):
+        old = previous.by_id if previous is not None else {}
+        self.entry_tokens = {}
+        self.prompt_lines = {}
+        self.url_to_id = dict(previous.url_to_id) if previous is not None else {}
+        inverted = dict(previous.inverted) if previous is not None else {}
+        trigram_index = dict(previous.trigram_index) if previous is not None else {}
+        touched = set()
+
+        def postings(tok):
+            # Purane snapshot ka set kabhi mutate nahi hota, pehli baar chhune pe copy
+            if tok not in touched:
+                inverted[tok] = set(inverted.get(tok, ()))
+                touched.add(tok)
+            return inverted[tok]
+
+        for entry_id, entry in old.items():
+            if self.by_id.get(entry_id) == entry:
+                continue
+            for tok in set(previous.entry_tokens[entry_id]):
+                postings(tok).discard(entry_id)
+            for url in (entry.download_link, markdown_link(entry.download_link)):
+                if self.url_to_id.get(url) == entry_id:
+                    del self.url_to_id[url]
+
+        for entry in self.entries:
+            if old.get(entry.id) == entry:
+                self.entry_tokens[entry.id] = previous.entry_tokens[entry.id]
+                self.prompt_lines[entry.id] = previous.prompt_lines[entry.id]
+                continue
+            self.changed += 1
+            tokens = tuple(title_tokens(entry.title))
+            self.entry_tokens[entry.id] = tokens
+            self.prompt_lines[entry.id] = prompt_line(entry)
+            for tok in set(tokens):
+                postings(tok).add(entry.id)
+            # History me pade lambe links wapas ID me badalne ke liye
+            self.url_to_id[entry.download_link] = entry.id
+            self.url_to_id[markdown_link(entry.download_link)] = entry.id
+
+        # Vocab me aaye / gaye tokens ke hi trigrams update
+        old_vocab = previous.inverted if previous is not None else {}
+        trigrams_touched = set()
+        for tok in touched:
+            if not inverted[tok]:
+                del inverted[tok]
+            if (tok in inverted) == (tok in old_vocab):
+                continue
+            for tri in trigrams(tok):
+                if tri not in trigrams_touched:
+                    trigram_index[tri] = set(trigram_index.get(tri, ()))
+                    trigrams_touched.add(tri)
+                if tok in inverted:
+                    trigram_index[tri].add(tok)
+                else:
+                    trigram_index[tri].discard(tok)
+        for tri in trigrams_touched:
+            if not trigram_index[tri]:
+                del trigram_index[tri]
+
+        self.inverted = inverted
+        self.trigram_index = trigram_index
+        # IDF total count pe depend karta hai, par ye sirf vocab size jitna kaam hai
+        total = len(self.entries) or 1
+        self.idf = {tok: math.log(1 + total / len(ids)) for tok, ids in inverted.items()}
+
+    def updated(self, entries):
+        """Naye entries ka snapshot, sirf diff dobara index karke."""
+        return CatalogIndex(entries, self.version + 1, previous=self)
+
+    def _resolve_token(self, token):
+        """Query token ke liye (vocab_token, similarity) ki list."""
+        if token in self.inverted:
+            return [(token, 1.0)]
+        if token.isdigit() or len(token) < 3:
+            return []
+        candidates = set()
+        for tri in trigrams(token):
+            candidates |= self.trigram_index.get(tri, set())
+        matches = []
+        for cand in candidates:
+            if cand.isdigit():
+                continue
+            sim = trigram_similarity(token, cand)
+            if sim >= FUZZY_MIN_SIMILARITY:
+                matches.append((cand, sim))
+        return matches
+
+    def search(self, text, limit=5):
+        """(score, entry) ki list, best pehle."""
+        q_tokens = query_tokens(text)
+        if not q_tokens:
+            return []
+
+        # Har entry ke liye: matched vocab token -> best similarity
+        hits = {}
+        for q in q_tokens:
+            for vocab_tok, sim in self._resolve_token(q):
+                for entry_id in self.inverted[vocab_tok]:
+                    matched = hits.setdefault(entry_id, {})
+                    if sim > matched.get(vocab_tok, 0.0):
+                        matched[vocab_tok] = sim
+
+        q_numbers = {t for t in q_tokens if t.isdigit()}
+        default_idf = max(self.idf.values(), default=1.0)
+        q_weight = sum(self.idf.get(q, default_idf) for q in q_tokens)
+
+        results = []
+        for entry_id, matched in hits.items():
+            tokens = self.entry_tokens[entry_id]
+            t_numbers = {t for t in tokens if t.isdigit()}
+            # "Season 2" maanga to "Season 3" nahi dena
+            if q_numbers and t_numbers and not (q_numbers & t_numbers):
+                continue
+
+            got = sum(self.idf[tok] * sim for tok, sim in matched.items())
+            title_weight = sum(self.idf[tok] for tok in set(tokens))
+            query_cover = min(1.0, got / q_weight)
+            title_cover = min(1.0, got / title_weight) if title_weight else 0.0
+            score = 0.6 * query_cover + 0.4 * title_cover
+            results.append((round(score, 4), self.by_id[entry_id]))
+
+        results.sort(key=lambda r: (-r[0], r[1].title))
+        return results[:limit]
+
+    def lookup(self, text):
+        """Confident match ho to entries ki list, warna None (LLM pe bhejo)."""
+        results = self.search(text, limit=CATALOG_MAX_TIED + 1)
+        if not results or results[0][0] < CATALOG_MATCH_THRESHOLD:
+            return None
+        top = results[0][0]
+        tied = [entry for score, entry in results if top - score < CATALOG_MATCH_MARGIN]
+        if len(tied) > CATALOG_MAX_TIED:
+            return None
+        return tied
+
+
+def markdown_link(url):
+    # Legacy Markdown me link ke andar ")" link tod deta hai
+    return url.replace("(", "%28").replace(")", "%29")
+
+
+def format_entry(entry):
+    return f"🎬 *{entry.title}*\n🔗 [Click to Download]({markdown_link(entry.download_link)})"
+
+
+def format_catalog_reply(entries):
+    """SYSTEM_PROMPT wale 🎬/🔗 format me reply."""
+    body = "\n\n".join(format_entry(e) for e in entries)
+    return f"{random.choice(CATALOG_HYPE_LINES)}\n\n{body}"
+
+
+def load_catalog_file(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_catalog(json.load(f))
+
+
+class CatalogStore:
+    """Current CatalogIndex snapshot + background watcher.
+
+    Handlers `catalog_store.index` ek baar padhte hain; reload naya snapshot bana ke sirf reference
+    badalta hai, isliye chal rahe handlers purane snapshot pe bina lock ke kaam poora karte hain.
+    """
+
+    def __init__(self, path=CATALOG_PATH, poll_interval=CATALOG_POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.collection = None  # AsyncCollection, CATALOG_SOURCE == "mongo" ho tab
+        self._stamp = self._file_stamp()
+        self._fingerprint = None
+        self.index = CatalogIndex(load_catalog_file(path))
+        self.reloads = 0
+        self._task = None
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    async def _apply(self, entries):
+        # Index build thread me hota hai (purana snapshot immutable hai), swap event loop pe
+        new_index = await asyncio.to_thread(self.index.updated, entries)
+        if new_index.changed == 0 and len(new_index.entries) == len(self.index.entries):
+            return False
+        self.index = new_index
+        self.reloads += 1
+        print(f"📚 Catalog v{new_index.version}: {len(new_index.entries)} entries, {new_index.changed} updated")
+        return True
+
+    async def _reload_file(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        # Stamp pehle hi, taaki adhoori file ka error har poll pe na aaye (agla write stamp badal dega)
+        self._stamp = stamp
+        entries = await asyncio.to_thread(load_catalog_file, self.path)
+        return await self._apply(entries)
+
+    async def _reload_mongo(self):
+        docs = await self.collection.find({}, {"_id": 0}, sort=[("kind", 1), ("order", 1)])
+        if not docs:
+            # Pehli baar: file wala catalog Mongo me daal do
+            docs = [dict(e._asdict(), order=n) for n, e in enumerate(self.index.entries)]
+            await self.collection.insert_many([dict(d) for d in docs])
+        fingerprint = hashlib.sha1(json.dumps(docs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        if fingerprint == self._fingerprint:
+            return False
+        self._fingerprint = fingerprint
+        data = {"movies": [d for d in docs if d.get("kind") == "movie"],
+                "seasons": [d for d in docs if d.get("kind") == "season"]}
+        return await self._apply(parse_catalog(data))
+
+    async def reload(self):
+        """Source badla ho to naya snapshot. Kuch badla to True."""
+        if self.collection is not None:
+            return await self._reload_mongo()
+        return await self._reload_file()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                # Adhoori likhi file / Mongo down: purana snapshot chalta rahega, agli baar retry
+                print(f"⚠️ Catalog reload error: {e}")
+
+    def start(self):
+        if self._task is None and self.poll_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""User chat history store: bounded in-memory LRU + optional write-behind Mongo tier (database.AsyncCollection)."""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+CONVERSATION_STORE_BACKEND = os.environ.get("CONVERSATION_STORE_BACKEND", "memory")  # memory | mongo
+HISTORY_LIMIT = 10
+CONVERSATION_MAX_USERS = int(os.environ.get("CONVERSATION_MAX_USERS", "20000"))
+CONVERSATION_MAX_BYTES = int(os.environ.get("CONVERSATION_MAX_BYTES", str(64 * 1024 * 1024)))
+CONVERSATION_IDLE_TTL = int(os.environ.get("CONVERSATION_IDLE_TTL", "3600"))  # 1 ghanta chup = session khatam
+CONVERSATION_FLUSH_INTERVAL = float(os.environ.get("CONVERSATION_FLUSH_INTERVAL", "5"))
+# Mongo me history kitne din rakhni hai (TTL index)
+CONVERSATION_PERSIST_TTL = int(os.environ.get("CONVERSATION_PERSIST_TTL", str(7 * 24 * 3600)))
+
+# Message tuple (role_code, text) me store hota hai, dict se kaafi chhota
+ROLES = ("user", "assistant")
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+MESSAGE_OVERHEAD = 64  # tuple + str header ka rough size
+
+
+def _message_size(text):
+    return MESSAGE_OVERHEAD + len(text.encode("utf-8"))
+
+
+class Session:
+    __slots__ = ("messages", "last_seen", "nbytes")
+
+    def __init__(self, messages=()):
+        self.messages = deque(maxlen=HISTORY_LIMIT)
+        self.nbytes = 0
+        self.last_seen = time.monotonic()
+        for code, text in messages:
+            self.add(code, text)
+
+    def add(self, code, text):
+        if len(self.messages) == self.messages.maxlen:
+            self.nbytes -= _message_size(self.messages[0][1])
+        self.messages.append((code, text))
+        self.nbytes += _message_size(text)
+
+    def as_dicts(self):
+        return [{"role": ROLES[code], "content": text} for code, text in self.messages]
+
+
+class ConversationStore:
+    def __init__(self, max_users=CONVERSATION_MAX_USERS, max_bytes=CONVERSATION_MAX_BYTES,
+                 idle_ttl=CONVERSATION_IDLE_TTL, collection=None, flush_interval=CONVERSATION_FLUSH_INTERVAL):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self._sessions = OrderedDict()  # user_id -> Session, LRU order
+        self._bytes = 0
+        self._dirty = {}  # user_id -> messages snapshot jo Mongo me likhna baaki hai
+        self._flushing = {}  # abhi bulk_write me ja raha batch (Mongo me pahuncha nahi)
+        self._indexed = False
+        self._task = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    # --- In-memory tier ---
+    def _drop(self, user_id):
+        session = self._sessions.pop(user_id)
+        self._bytes -= session.nbytes
+
+    def _evict(self):
+        while self._sessions and (len(self._sessions) > self.max_users or self._bytes > self.max_bytes):
+            # Dirty session ka snapshot _dirty me already hai, isliye drop safe hai
+            self._drop(next(iter(self._sessions)))
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if session.last_seen >= cutoff:
+                break
+            self._drop(user_id)
+
+    def _touch(self, user_id, session):
+        session.last_seen = time.monotonic()
+        self._sessions.move_to_end(user_id)
+
+    async def _session(self, user_id):
+        session = self._sessions.get(user_id)
+        if session is not None and session.last_seen < time.monotonic() - self.idle_ttl:
+            self._drop(user_id)
+            session = None
+        if session is None:
+            messages = await self._load(user_id)
+            # Load ke dauraan kisi aur message ne session bana diya ho to wahi use karo
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = Session(messages)
+                self._sessions[user_id] = session
+                self._bytes += session.nbytes
+        self._touch(user_id, session)
+        return session
+
+    async def get_history(self, user_id):
+        """LLM ke liye [{"role", "content"}, ...] list."""
+        session = await self._session(user_id)
+        return session.as_dicts()
+
+    async def append(self, user_id, role, content):
+        session = await self._session(user_id)
+        before = session.nbytes
+        session.add(ROLE_CODES[role], content)
+        self._bytes += session.nbytes - before
+        self._mark_dirty(user_id, session)
+        self._evict()
+
+    async def reset(self, user_id):
+        if user_id in self._sessions:
+            self._drop(user_id)
+        session = Session()
+        self._sessions[user_id] = session
+        self._mark_dirty(user_id, session)
+        self._evict()
+
+    # --- Write-behind Mongo tier ---
+    def _mark_dirty(self, user_id, session):
+        if self.collection is not None:
+            self._dirty[user_id] = list(session.messages)
+
+    async def _load(self, user_id):
+        if self.collection is None:
+            return []
+        # Evict hua session jiska snapshot abhi flush nahi hua: Mongo wala copy purana hai
+        pending = self._dirty.get(user_id, self._flushing.get(user_id))
+        if pending is not None:
+            return list(pending)
+        try:
+            doc = await self.collection.find_one({"_id": user_id}, {"messages": 1})
+        except Exception as e:
+            print(f"⚠️ History load error: {e}")
+            return []
+        return [tuple(m) for m in doc["messages"]] if doc else []
+
+    async def create_indexes(self):
+        """TTL index, startup pe background me ek baar (write path pe nahi)."""
+        if self.collection is not None and not self._indexed:
+            await self.collection.create_index("updated_at", expireAfterSeconds=CONVERSATION_PERSIST_TTL)
+            self._indexed = True
+
+    async def flush(self):
+        if self.collection is None or not self._dirty:
+            return
+        from pymongo import UpdateOne
+
+        batch, self._dirty = self._dirty, {}
+        self._flushing = batch
+        now = datetime.now(timezone.utc)
+        ops = [UpdateOne({"_id": user_id}, {"$set": {"messages": [list(m) for m in messages], "updated_at": now}},
+                         upsert=True)
+               for user_id, messages in batch.items()]
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+        except Exception as e:
+            print(f"⚠️ History flush error: {e}")
+            # Naye changes ko overwrite kiye bina wapas queue me daalo
+            for user_id, messages in batch.items():
+                self._dirty.setdefault(user_id, messages)
+        finally:
+            self._flushing = {}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._expire_idle()
+            await self.flush()
+
+    def start(self):
+        """Background flush / expiry loop (event loop chalne ke baad call karo)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""Non-blocking Mongo layer: pymongo calls ek dedicated, bounded thread pool me chalti hain."""
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+DB_NAME = "dorebox_bot"
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "16"))
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", str(DB_EXECUTOR_WORKERS)))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_TIMEOUT_MS = int(os.environ.get("MONGO_TIMEOUT_MS", "5000"))
+USER_COUNT_CACHE_TTL = 60  # /stats ka count itne second tak reuse
+
+# Default executor se alag, taaki slow Atlas baaki kaam (LLM, PTB) ke threads na khaaye
+_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="mongo")
+_pending = 0
+
+
+def pending_db_calls():
+    """Executor me queued + running calls (metrics ke liye)."""
+    return _pending
+
+
+async def run_db(fn, *args, **kwargs):
+    global _pending
+    loop = asyncio.get_running_loop()
+    _pending += 1
+    try:
+        with metrics.phase("mongo"):
+            return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+    finally:
+        _pending -= 1
+
+
+class AsyncCollection:
+    """pymongo Collection ka async wrapper. Cursor wale calls list return karte hain."""
+
+    def __init__(self, collection):
+        self.sync = collection
+
+    @property
+    def name(self):
+        return self.sync.name
+
+    async def find_one(self, *args, **kwargs):
+        return await run_db(self.sync.find_one, *args, **kwargs)
+
+    async def find(self, filter=None, projection=None, sort=None, limit=0):
+        def _find():
+            cursor = self.sync.find(filter or {}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        return await run_db(_find)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return await run_db(self.sync.find_one_and_update, *args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return await run_db(self.sync.insert_one, *args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return await run_db(self.sync.insert_many, *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await run_db(self.sync.update_one, *args, **kwargs)
+
+    async def replace_one(self, *args, **kwargs):
+        return await run_db(self.sync.replace_one, *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await run_db(self.sync.delete_many, *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await run_db(self.sync.bulk_write, *args, **kwargs)
+
+    async def create_index(self, *args, **kwargs):
+        return await run_db(self.sync.create_index, *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return await run_db(self.sync.count_documents, *args, **kwargs)
+
+    async def estimated_document_count(self):
+        return await run_db(self.sync.estimated_document_count)
+
+
+class Database:
+    def __init__(self, uri, name=DB_NAME):
+        self.uri = uri
+        self.name = name
+        self.client = None
+        self.db = None
+        self.users = None
+        self._user_count = None  # (count, monotonic time)
+
+    @property
+    def connected(self):
+        return self.db is not None
+
+    def _connect_sync(self):
+        # pymongo / dnspython bhari imports hain, pehle connect tak taalo (cold start)
+        import dns.resolver
+        from pymongo import MongoClient
+
+        # DNS Fix for Render/Cloud
+        dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
+        dns.resolver.default_resolver.nameservers = ['8.8.8.8']
+
+        client = MongoClient(
+            self.uri,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_TIMEOUT_MS,
+            retryWrites=True,
+        )
+        client.admin.command('ping') # Check connection
+        return client
+
+    async def connect(self):
+        self.client = await run_db(self._connect_sync)
+        self.db = self.client.get_database(self.name)
+        self.users = self.collection("users")
+
+    async def create_indexes(self):
+        """Connect ke baad background me; upsert bina index ke bhi sahi chalta hai."""
+        await self.users.create_index("user_id", unique=True)
+
+    def collection(self, name):
+        return AsyncCollection(self.db[name])
+
+    async def add_user(self, user_id, name):
+        """Ek hi upsert. Naya user tha to True."""
+        result = await self.users.update_one(
+            {"user_id": user_id},
+            {"$setOnInsert": {"user_id": user_id, "name": name}},
+            upsert=True,
+        )
+        if result.upserted_id is not None and self._user_count is not None:
+            count, at = self._user_count
+            self._user_count = (count + 1, at)
+        return result.upserted_id is not None
+
+    async def user_count(self):
+        """Collection metadata se estimated count, thodi der cache karke."""
+        now = time.monotonic()
+        if self._user_count is None or now - self._user_count[1] > USER_COUNT_CACHE_TTL:
+            self._user_count = (await self.users.estimated_document_count(), now)
+        return self._user_count[0]
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""Async OpenRouter client: pooled connections, concurrency cap, retries, streaming."""
+
+import asyncio
+import json
+import os
+import random
+from contextlib import asynccontextmanager
+
+import httpx
+
+import metrics
+
+# Benchmark / proxy ke liye override ho sakta hai
+OPENROUTER_URL = os.environ.get("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "32"))
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+# Saare attempts + backoff milake ek reply ka max time (s)
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", "15"))
+LLM_BACKOFF_BASE = 0.5
+LLM_BACKOFF_MAX = 4.0
+
+# Sirf wahi errors jinme request OpenRouter tak pahunchi hi nahi. ReadTimeout pe retry = same reply dobara bill.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class LLMError(Exception):
+    """OpenRouter call fail hua. status_code None matlab network error."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OpenRouterClient:
+    """Ek shared httpx.AsyncClient (keep-alive pool) + semaphore se in-flight requests limit."""
+
+    def __init__(self, api_key, model, max_concurrency=LLM_MAX_CONCURRENCY,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, deadline=LLM_DEADLINE, base_url=OPENROUTER_URL):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client = None
+        self._semaphore = None
+        self.in_flight = 0
+
+    def _ensure_client(self):
+        # Event loop ke andar hi banana hai, isliye lazy
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                    "X-Title": "DoreBox Telegram Bot",
+                },
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    @asynccontextmanager
+    async def _slot(self):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                with metrics.phase("llm"):
+                    yield
+            finally:
+                self.in_flight -= 1
+
+    def _payload(self, messages, stream, temperature, max_tokens):
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+
+    def _start_deadline(self):
+        return asyncio.get_running_loop().time() + self.deadline
+
+    def _attempt_timeout(self, deadline):
+        """Is attempt ka timeout: configured wala, par deadline ke baad tak nahi. Time khatam to LLMError."""
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise LLMError("Deadline exceeded")
+        return httpx.Timeout(min(self.timeout.read, remaining), connect=min(self.timeout.connect, remaining))
+
+    async def _backoff(self, attempt, deadline):
+        """Retry se pehle ruko. False matlab deadline tak retry ka time nahi bacha."""
+        # Exponential backoff + full jitter, taaki sab replicas ek saath retry na karein
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+        if asyncio.get_running_loop().time() + delay >= deadline:
+            return False
+        await asyncio.sleep(delay)
+        return True
+
+    async def complete(self, messages, temperature=0.7, max_tokens=400):
+        """Poora reply ek saath. Connect error / 5xx pe retry, sab milake `deadline` ke andar; baaki pe LLMError."""
+        client = self._ensure_client()
+        payload = self._payload(messages, False, temperature, max_tokens)
+        async with self._slot():
+            try:
+                return await asyncio.wait_for(self._complete(client, payload), self.deadline)
+            except asyncio.TimeoutError as e:
+                metrics.LLM_RESPONSES.inc(status="network")
+                raise LLMError("Deadline exceeded") from e
+
+    async def _complete(self, client, payload):
+        deadline = self._start_deadline()
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = await client.post(self.base_url, json=payload,
+                                             timeout=self._attempt_timeout(deadline))
+            except httpx.HTTPError as e:
+                metrics.LLM_RESPONSES.inc(status="network")
+                if last or not isinstance(e, RETRYABLE_ERRORS) or not await self._backoff(attempt, deadline):
+                    raise LLMError(str(e) or type(e).__name__) from e
+                continue
+
+            metrics.LLM_RESPONSES.inc(status=str(response.status_code))
+            if response.status_code == 200:
+                try:
+                    return response.json()['choices'][0]['message']['content']
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    raise LLMError(f"Bad response: {e!r}") from e
+            if response.status_code >= 500 and not last and await self._backoff(attempt, deadline):
+                continue
+            raise LLMError(f"HTTP {response.status_code}", response.status_code)
+
+    async def stream(self, messages, temperature=0.7, max_tokens=400):
+        """Tokens aate hi yield karta hai (SSE). Retry sirf connect error / 5xx pe, pehle token se pehle.
+
+        Deadline attempts + backoff pe lagti hai; tokens aana shuru ho gaye to har chunk pe sirf read timeout.
+        """
+        client = self._ensure_client()
+        payload = self._payload(messages, True, temperature, max_tokens)
+        async with self._slot():
+            deadline = self._start_deadline()
+            for attempt in range(self.max_retries + 1):
+                last = attempt == self.max_retries
+                started = False
+                try:
+                    async with client.stream("POST", self.base_url, json=payload,
+                                             timeout=self._attempt_timeout(deadline)) as response:
+                        metrics.LLM_RESPONSES.inc(status=str(response.status_code))
+                        if response.status_code != 200:
+                            if response.status_code >= 500 and not last and await self._backoff(attempt, deadline):
+                                continue
+                            raise LLMError(f"HTTP {response.status_code}", response.status_code)
+
+                        async for line in response.aiter_lines():
+                            # ": OPENROUTER PROCESSING" jaise comment lines skip
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                return
+                            try:
+                                chunk = json.loads(data)
+                            except ValueError:
+                                continue
+                            if "error" in chunk:
+                                raise LLMError(str(chunk["error"].get("message", "stream error")),
+                                               chunk["error"].get("code"))
+                            choices = chunk.get("choices") or [{}]
+                            text = (choices[0].get("delta") or {}).get("content")
+                            if text:
+                                started = True
+                                yield text
+                        return
+                except httpx.HTTPError as e:
+                    metrics.LLM_RESPONSES.inc(status="network")
+                    if (started or last or not isinstance(e, RETRYABLE_ERRORS)
+                            or not await self._backoff(attempt, deadline)):
+                        raise LLMError(str(e) or type(e).__name__) from e
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""Chhota in-process metrics registry (Prometheus text format) + handler / phase timing."""
+
+import asyncio
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from telegram.request import HTTPXRequest
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 60)
+SLOW_REQUEST_THRESHOLD = float(os.environ.get("SLOW_REQUEST_THRESHOLD", "3"))
+SLOW_REQUEST_SAMPLE_RATE = float(os.environ.get("SLOW_REQUEST_SAMPLE_RATE", "0.1"))
+
+# Current handler ka naam + uske phases (llm / mongo / telegram) ka total time
+_handler = contextvars.ContextVar("handler", default=None)
+_phases = contextvars.ContextVar("phases", default=None)
+
+
+def _label_str(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{k}="{str(v)}"' for k, v in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = _label_str(self.labelnames + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames + ('le',), key + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value scrape ke time callback se aati hai. Bahar ke counters (jaise cache hits) ke liye kind="counter"."""
+
+    def __init__(self, name, help, fn, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+
+    def render(self):
+        try:
+            value = float(self.fn())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", f"{self.name} {value}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        # Same naam dobara register ho (jaise naya Application) to purana replace
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, fn, kind="gauge"):
+        return self._add(Gauge(name, help, fn, kind))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HANDLER_LATENCY = REGISTRY.histogram("dorebox_handler_seconds", "Handler ka total time", ["handler"])
+PHASE_LATENCY = REGISTRY.histogram("dorebox_handler_phase_seconds",
+                                   "Handler ke andar LLM / Mongo / Telegram calls ka time", ["handler", "phase"])
+HANDLER_ERRORS = REGISTRY.counter("dorebox_handler_errors_total", "Handlers me pakde gaye errors", ["handler"])
+LLM_RESPONSES = REGISTRY.counter("dorebox_openrouter_responses_total", "OpenRouter responses by status code",
+                                 ["status"])
+FALLBACKS = REGISTRY.counter("dorebox_fallback_replies_total", "LLM ki jagah fallback/degraded replies", ["reason"])
+CATALOG_ANSWERS = REGISTRY.counter("dorebox_catalog_answers_total", "Catalog index se diye gaye direct jawab")
+SLOW_REQUESTS = REGISTRY.counter("dorebox_slow_requests_total", "SLOW_REQUEST_THRESHOLD se lambe handlers",
+                                 ["handler"])
+
+
+def render():
+    return REGISTRY.render()
+
+
+@contextmanager
+def phase(name):
+    """`with phase("mongo"):` — time current handler ke naam pe record hota hai."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_LATENCY.observe(elapsed, handler=_handler.get() or "background", phase=name)
+        phases = _phases.get()
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + elapsed
+
+
+def background_task(coro):
+    """Handler ke andar se shuru hua background kaam (index build, broadcast job) us handler ke naam pe na gine.
+
+    create_task current context copy karta hai; khaali context me banao to phases "background" pe record hote hain.
+    """
+    return contextvars.Context().run(asyncio.get_running_loop().create_task, coro)
+
+
+def instrument(name):
+    """Async PTB handler ke liye decorator: latency histogram + slow request sampling."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            handler_token = _handler.set(name)
+            phases = {}
+            phases_token = _phases.set(phases)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                HANDLER_ERRORS.inc(handler=name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                HANDLER_LATENCY.observe(elapsed, handler=name)
+                if elapsed >= SLOW_REQUEST_THRESHOLD:
+                    SLOW_REQUESTS.inc(handler=name)
+                    if random.random() < SLOW_REQUEST_SAMPLE_RATE:
+                        detail = " ".join(f"{k}={v:.2f}s" for k, v in phases.items())
+                        print(f"🐢 Slow {name}: {elapsed:.2f}s {detail}")
+                _phases.reset(phases_token)
+                _handler.reset(handler_token)
+        return wrapper
+    return decorator
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """Har Bot API call ka time "telegram" phase me."""
+
+    async def do_request(self, *args, **kwargs):
+        with phase("telegram"):
+            return await super().do_request(*args, **kwargs)
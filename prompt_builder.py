@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""Prompt builder: poore catalog ki jagah sirf relevant entries (short IDs ke saath) + token budget."""
+
+import os
+import re
+
+from catalog import markdown_link
+
+PROMPT_TOP_K = int(os.environ.get("PROMPT_TOP_K", "8"))
+# System prompt + history ka max estimated tokens (reply ke max_tokens alag hain)
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "1800"))
+# Relevance ke liye kitne recent user messages dekhne hain
+PROMPT_QUERY_MESSAGES = 3
+MESSAGE_TOKEN_OVERHEAD = 4
+WEBSITE_URL = "https://dorebox.vercel.app"
+
+# "](M12)" jaisa link target
+ID_LINK_RE = re.compile(r"\]\(\s*([MS]\d+)\s*\)")
+
+
+def estimate_tokens(text):
+    """Rough estimate (~4 chars per token), tokenizer load karne ki zaroorat nahi."""
+    return len(text) // 4 + 1
+
+
+class PromptBuilder:
+    """`catalog_store.index` har build pe ek baar padha jata hai, isliye catalog reload bina restart ke dikhta hai."""
+
+    def __init__(self, template, catalog_store, top_k=PROMPT_TOP_K, token_budget=PROMPT_TOKEN_BUDGET):
+        self.template = template
+        self.catalog_store = catalog_store
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self._url_re = (None, None)  # (index version, compiled regex)
+
+    def relevant_entries(self, conversation_history, index):
+        """Recent user messages se top-k entries. Kuch match na ho to catalog ki pehli entries (suggestions ke liye)."""
+        scores = {}
+        user_messages = [m["content"] for m in conversation_history if m["role"] == "user"]
+        # Latest message ko thoda zyada weight
+        for age, text in enumerate(reversed(user_messages[-PROMPT_QUERY_MESSAGES:])):
+            for score, entry in index.search(text, limit=self.top_k):
+                weighted = score / (1 + age)
+                if weighted > scores.get(entry.id, (0.0, None))[0]:
+                    scores[entry.id] = (weighted, entry)
+
+        ranked = [entry for _, entry in sorted(scores.values(), key=lambda r: -r[0])][:self.top_k]
+        for entry in index.entries:
+            if len(ranked) >= self.top_k:
+                break
+            if entry not in ranked:
+                ranked.append(entry)
+        return ranked
+
+    def catalog_section(self, entries, index):
+        # Har entry ki line snapshot me pehle se bani hai (reload pe sirf badli hui lines banti hain)
+        lines = [index.prompt_lines[e.id] for e in entries]
+        lines.append(f"(Ye {len(index.entries)} me se sirf relevant entries hain. "
+                     f"Baaki sab website pe: {WEBSITE_URL})")
+        return "\n".join(lines)
+
+    def _url_pattern(self, index):
+        version, pattern = self._url_re
+        if version != index.version:
+            urls = sorted(index.url_to_id, key=len, reverse=True)
+            pattern = re.compile("|".join(re.escape(u) for u in urls)) if urls else None
+            self._url_re = (index.version, pattern)
+        return pattern
+
+    def compact_links(self, text, index):
+        pattern = self._url_pattern(index)
+        if pattern is None:
+            return text
+        return pattern.sub(lambda m: index.url_to_id[m.group(0)], text)
+
+    def expand_links(self, text):
+        """Model ke reply me "](M12)" ko asli download link se badalna. Unknown ID -> website."""
+        index = self.catalog_store.index
+
+        def repl(m):
+            entry = index.by_id.get(m.group(1))
+            url = markdown_link(entry.download_link) if entry else WEBSITE_URL
+            return f"]({url})"
+        return ID_LINK_RE.sub(repl, text)
+
+    def build(self, conversation_history):
+        """OpenRouter ke liye messages list, budget ke andar."""
+        index = self.catalog_store.index
+        entries = self.relevant_entries(conversation_history, index)
+        system = self.template.replace("{catalog}", self.catalog_section(entries, index))
+        budget = self.token_budget - estimate_tokens(system) - MESSAGE_TOKEN_OVERHEAD
+
+        history = []
+        # Naye se purane ki taraf; latest message hamesha jayega
+        for message in reversed(conversation_history):
+            content = self.compact_links(message["content"], index)
+            cost = estimate_tokens(content) + MESSAGE_TOKEN_OVERHEAD
+            if history and cost > budget:
+                break
+            history.append({"role": message["role"], "content": content})
+            budget -= cost
+        history.reverse()
+        # Pehla message assistant ka ho to context adhoora lagta hai, hata do
+        while len(history) > 1 and history[0]["role"] == "assistant":
+            history.pop(0)
+        return [{"role": "system", "content": system}] + history
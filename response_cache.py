@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""LLM reply cache: same chhoti conversation ka same jawab dobara OpenRouter se nahi mangwana."""
+
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")  # memory | mongo
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "21600"))  # 6 ghante
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+# Sirf itne ya kam messages wali history cache hoti hai (shuru ki baatein sabki same hoti hain)
+RESPONSE_CACHE_MAX_HISTORY = int(os.environ.get("RESPONSE_CACHE_MAX_HISTORY", "3"))
+
+
+def normalize_message(text):
+    """'Hi!!', 'hi ' aur 'HI' ek hi key banayein."""
+    text = text.lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = re.sub(r"([a-z])\1{2,}", r"\1", text)  # "hiiiii" -> "hi" (sirf letters, "1000" / "2222" same rehte hain)
+    return " ".join(text.split())
+
+
+def prompt_hash(system_prompt):
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def make_key(conversation_history, model, system_prompt_hash):
+    """Cacheable na ho (lambi history) to None."""
+    if not conversation_history or len(conversation_history) > RESPONSE_CACHE_MAX_HISTORY:
+        return None
+    normalized = [(m["role"], normalize_message(m["content"])) for m in conversation_history]
+    raw = json.dumps([model, system_prompt_hash, normalized], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU + TTL."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    async def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MongoCacheBackend:
+    """Mongo collection (database.AsyncCollection), sab replicas ke beech shared. Expiry Mongo ka TTL index karta hai."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexed = False
+
+    async def get(self, key):
+        doc = await self.collection.find_one({"_id": key}, {"value": 1, "expires_at": 1})
+        if not doc:
+            return None
+        # TTL monitor ~60s me chalta hai, tab tak expired doc bhi mil sakta hai
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at < datetime.now(timezone.utc):
+            return None
+        return doc["value"]
+
+    async def create_indexes(self):
+        """TTL index, startup pe background me ek baar (write path pe nahi)."""
+        if not self._indexed:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+    async def set(self, key, value, ttl):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        await self.collection.replace_one({"_id": key}, {"_id": key, "value": value, "expires_at": expires_at},
+                                          upsert=True)
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl=RESPONSE_CACHE_TTL):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key):
+        if key is None:
+            return None
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            print(f"⚠️ Cache read error: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key, value):
+        if key is None:
+            return
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            print(f"⚠️ Cache write error: {e}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        return f"🧠 Cache: {self.hits} hits / {self.misses} misses ({ratio:.0f}%)"
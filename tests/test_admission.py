@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""Admission: half-open probe hamesha settle ho, aur coalescing sirf chal rahe request ke dauraan."""
+
+import asyncio
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, CircuitBreaker, Overloaded  # noqa: E402
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(quota_cooldown=0.0)
+    # Cooldown 0: 429 ke turant baad half_open
+    breaker.record_failure(429)
+    assert breaker.state == "half_open"
+    return breaker
+
+
+class BreakerProbeTest(unittest.TestCase):
+    def test_cache_hit_probe_is_released(self):
+        breaker = half_open_breaker()
+        with breaker.attempt() as allowed:
+            self.assertTrue(allowed)
+            # Cache se jawab: record_success / record_failure kuch nahi
+        self.assertEqual(breaker.state, "half_open")
+        self.assertFalse(breaker.probing)
+        with breaker.attempt() as allowed:
+            self.assertTrue(allowed)
+            breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual([breaker.allow() for _ in range(3)], [True, True, True])
+
+    def test_overloaded_probe_is_released(self):
+        admission = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=0.01, coalesce=False)
+        admission.breaker = breaker = half_open_breaker()
+
+        async def scenario():
+            async with admission.llm_slot():  # ek slot pehle se busy
+                with self.assertRaises(Overloaded):
+                    with breaker.attempt() as allowed:
+                        self.assertTrue(allowed)
+                        async with admission.llm_slot():
+                            pass
+
+        asyncio.run(scenario())
+        self.assertFalse(breaker.probing)
+        with breaker.attempt() as allowed:
+            self.assertTrue(allowed)
+
+    def test_only_one_probe_at_a_time(self):
+        breaker = half_open_breaker()
+        with breaker.attempt() as first:
+            with breaker.attempt() as second:
+                self.assertTrue(first)
+                self.assertFalse(second)
+            # Reject hua attempt pehle probe ka claim nahi chhodta
+            self.assertTrue(breaker.probing)
+        self.assertFalse(breaker.probing)
+
+
+class CoalesceTest(unittest.TestCase):
+    def test_single_message_does_not_wait(self):
+        admission = AdmissionController()
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            async with admission.coalesce(1, "hi") as messages:
+                self.assertEqual(messages, ["hi"])
+            return loop.time() - start
+
+        self.assertLess(asyncio.run(scenario()), 0.05)
+
+    def test_messages_during_request_merge_into_next_leader(self):
+        admission = AdmissionController()
+        order = []
+
+        async def message(name, hold=0.0):
+            async with admission.coalesce(1, name) as messages:
+                order.append((name, messages))
+                await asyncio.sleep(hold)
+
+        async def scenario():
+            first = asyncio.create_task(message("first", hold=0.05))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(message("second"))
+            third = asyncio.create_task(message("third"))
+            await asyncio.gather(first, second, third)
+
+        asyncio.run(scenario())
+        # "third" follower hai (second ke buffer me), second pehle ke khatam hone ke baad dono ke saath chala
+        self.assertEqual(order, [("first", ["first"]), ("third", None), ("second", ["second", "third"])])
+        self.assertEqual(admission.coalesced, 1)
+
+
+class FakeMessage:
+    def __init__(self, text, replies):
+        self.text = text
+        self._replies = replies
+
+    async def reply_text(self, text, **kwargs):
+        self._replies.append(text)
+
+
+class FakeBot:
+    async def send_chat_action(self, **kwargs):
+        pass
+
+
+class ChatHistoryOrderTest(unittest.TestCase):
+    """ai_chat_handler ko concurrently chalao: coalesced messages pichle reply ke baad hi history me aayein."""
+
+    def setUp(self):
+        import bot
+        self.bot = bot
+        self.saved = {name: getattr(bot, name) for name in
+                      ("admission", "conversation_store", "response_cache", "OPENROUTER_API_KEY")}
+        bot.admission = AdmissionController(coalesce=True)
+        bot.conversation_store = bot.ConversationStore()
+        bot.response_cache = bot.ResponseCache()
+        bot.OPENROUTER_API_KEY = "test"
+        self.payloads = []
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(self.bot, name, value)
+
+    def test_coalesced_messages_follow_previous_reply(self):
+        bot = self.bot
+        replies = []
+
+        async def fake_complete(messages, **kwargs):
+            self.payloads.append([(m["role"], m["content"]) for m in messages[1:]])
+            await asyncio.sleep(0.05)
+            return f"reply{len(self.payloads)}"
+
+        def update(text):
+            return SimpleNamespace(effective_user=SimpleNamespace(id=7), effective_chat=SimpleNamespace(id=7),
+                                   message=FakeMessage(text, replies))
+
+        async def scenario():
+            context = SimpleNamespace(bot=FakeBot())
+            with mock.patch.object(bot.llm_client, "complete", fake_complete):
+                first = asyncio.create_task(bot.ai_chat_handler(update("m1"), context))
+                await asyncio.sleep(0.01)
+                await asyncio.gather(bot.ai_chat_handler(update("m2"), context),
+                                     bot.ai_chat_handler(update("m3"), context), first)
+            return await bot.conversation_store.get_history(7)
+
+        history = asyncio.run(scenario())
+        self.assertEqual(self.payloads[1], [("user", "m1"), ("assistant", "reply1"), ("user", "m2"), ("user", "m3")])
+        self.assertEqual([(m["role"], m["content"]) for m in history],
+                         [("user", "m1"), ("assistant", "reply1"), ("user", "m2"), ("user", "m3"),
+                          ("assistant", "reply2")])
+        self.assertEqual(replies, ["reply1", "reply2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
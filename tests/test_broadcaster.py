@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""Broadcast job lease: ek hi owner bhejta hai, restart pe resume, crash ke baad lease khatam hone pe claim."""
+
+import asyncio
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from broadcaster import Broadcaster, LeaseLost  # noqa: E402
+
+try:
+    import mongomock
+except ImportError:  # bench/requirements.txt me hai
+    mongomock = None
+
+USERS = 300
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.progress = asyncio.Event()
+
+    async def send_message(self, chat_id, text):
+        self.sent.append(chat_id)
+        if len(self.sent) >= USERS // 2:
+            self.progress.set()
+        await asyncio.sleep(0)
+        return type("Message", (), {"message_id": 1})()
+
+    async def edit_message_text(self, **kwargs):
+        pass
+
+
+@unittest.skipUnless(mongomock, "mongomock installed nahi hai")
+class BroadcastLeaseTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        client = mongomock.MongoClient()
+        self.users = database.AsyncCollection(client.db.users)
+        self.jobs = database.AsyncCollection(client.db.broadcast_jobs)
+        await self.users.insert_many([{"user_id": i} for i in range(1, USERS + 1)])
+
+    def broadcaster(self, bot=None):
+        return Broadcaster(bot or FakeBot(), self.users, self.jobs, rate=1e6, burst=10 ** 6, batch_size=50)
+
+    async def test_only_one_running_job_and_live_lease_not_claimable(self):
+        first, second = self.broadcaster(), self.broadcaster()
+        await first.create_indexes()
+        job = await first._create_job("hello", 1)
+        self.assertIsNotNone(job)
+        self.assertIsNone(await second._create_job("other", 1))
+        self.assertIsNone(await second._claim_orphan())
+
+        # Owner crash: lease khatam, ab doosra claim karega aur pehle ka save fail
+        await self.jobs.update_one({"_id": job["_id"]},
+                                   {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        claimed = await second._claim_orphan()
+        self.assertEqual(claimed["owner"], second.owner)
+        with self.assertRaises(LeaseLost):
+            await first._save(job, [])
+
+    async def test_restart_resumes_where_it_stopped(self):
+        bot = FakeBot()
+        old = self.broadcaster(bot)
+        await old.create_indexes()
+        self.assertIsNotNone(await old.start("hello", 1))
+        await bot.progress.wait()
+        await old.stop()
+        stopped = await self.jobs.find_one({"status": "running"})
+        self.assertIsNotNone(stopped["last_user_id"])
+        self.assertIsNone(stopped["lease_until"])
+
+        restarted = self.broadcaster(bot)
+        job = await restarted.resume()
+        self.assertIsNotNone(job)
+        self.assertEqual(job["last_user_id"], stopped["last_user_id"])
+        await restarted.task
+        done = await self.jobs.find_one({"_id": job["_id"]})
+        self.assertEqual(done["status"], "done")
+        self.assertEqual(set(bot.sent), set(range(1, USERS + 1)))
+        # Naya job ab ban sakta hai
+        self.assertIsNotNone(await restarted._create_job("next", 1))
+
+    async def test_watch_claims_crashed_replica_job(self):
+        crashed = self.broadcaster()
+        job = await crashed._create_job("hello", 1)
+        await self.jobs.update_one({"_id": job["_id"]},
+                                   {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        survivor = self.broadcaster()
+        survivor.lease_seconds = 0.01
+        survivor.watch()
+        try:
+            for _ in range(100):
+                if survivor.running:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertTrue(survivor.running)
+            await survivor.task
+        finally:
+            await survivor.stop()
+        self.assertEqual((await self.jobs.find_one({"_id": job["_id"]}))["status"], "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
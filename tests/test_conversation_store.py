@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""Write-behind tier: evict hua session jiska snapshot flush nahi hua, reload pe purana Mongo copy na le."""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_store import ConversationStore  # noqa: E402
+
+
+class FakeCollection:
+    """find_one + bulk_write(UpdateOne $set, upsert) bas, jitna store use karta hai."""
+
+    def __init__(self):
+        self.docs = {}
+        self.release = None  # set ho to bulk_write iska wait karta hai (flush beech me pakadne ke liye)
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.release is not None:
+            await self.release.wait()
+        for op in ops:
+            self.docs.setdefault(op._filter["_id"], {}).update(op._doc["$set"])
+
+
+def contents(history):
+    return [m["content"] for m in history]
+
+
+class WriteBehindTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.collection = FakeCollection()
+        self.store = ConversationStore(max_users=1, collection=self.collection)
+
+    async def persisted(self, user_id):
+        return [text for _, text in self.collection.docs[user_id]["messages"]]
+
+    async def test_evicted_unflushed_session_keeps_messages(self):
+        store = self.store
+        await store.append(1, "user", "first")
+        await store.flush()
+        await store.append(1, "user", "second")
+        await store.append(2, "user", "other")  # max_users=1: user 1 evict, "second" abhi flush nahi hua
+
+        self.assertEqual(contents(await store.get_history(1)), ["first", "second"])
+        await store.append(1, "user", "third")
+        await store.flush()
+        self.assertEqual(await self.persisted(1), ["first", "second", "third"])
+
+    async def test_reload_during_flush_uses_in_flight_snapshot(self):
+        store = self.store
+        await store.append(1, "user", "first")
+        await store.flush()
+        await store.append(1, "user", "second")
+        self.collection.release = asyncio.Event()
+        flushing = asyncio.create_task(store.flush())
+        await asyncio.sleep(0)
+        await store.append(2, "user", "other")
+
+        self.assertEqual(contents(await store.get_history(1)), ["first", "second"])
+        self.collection.release.set()
+        await flushing
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""LLM client: sirf connect error / 5xx pe retry (ReadTimeout = dobara bill nahi), aur ek overall deadline."""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_client  # noqa: E402
+from llm_client import LLMError, OpenRouterClient  # noqa: E402
+
+OK_BODY = {"choices": [{"message": {"content": "hello"}}]}
+
+
+def make_client(handler, **kwargs):
+    client = OpenRouterClient("key", "model", base_url="http://llm.test/chat", **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._semaphore = asyncio.Semaphore(client.max_concurrency)
+    return client
+
+
+class RetryTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls = 0
+        self._backoff_base = llm_client.LLM_BACKOFF_BASE
+        llm_client.LLM_BACKOFF_BASE = 0.001
+
+    def tearDown(self):
+        llm_client.LLM_BACKOFF_BASE = self._backoff_base
+
+    async def test_read_timeout_not_retried(self):
+        def handler(request):
+            self.calls += 1
+            raise httpx.ReadTimeout("slow", request=request)
+        with self.assertRaises(LLMError):
+            await make_client(handler).complete([])
+        self.assertEqual(self.calls, 1)
+
+    async def test_connect_error_retried(self):
+        def handler(request):
+            self.calls += 1
+            if self.calls == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, json=OK_BODY)
+        self.assertEqual(await make_client(handler).complete([]), "hello")
+        self.assertEqual(self.calls, 2)
+
+    async def test_5xx_retried_then_gives_up(self):
+        def handler(request):
+            self.calls += 1
+            return httpx.Response(502)
+        with self.assertRaises(LLMError) as ctx:
+            await make_client(handler, max_retries=2).complete([])
+        self.assertEqual(ctx.exception.status_code, 502)
+        self.assertEqual(self.calls, 3)
+
+    async def test_deadline_caps_whole_call(self):
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json=OK_BODY)
+        started = time.monotonic()
+        with self.assertRaises(LLMError):
+            await make_client(handler, deadline=0.1).complete([])
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
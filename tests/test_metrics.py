@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+"""Handler se shuru hua background task us handler ke naam pe time record na kare."""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+
+
+async def current_labels():
+    return metrics._handler.get(), metrics._phases.get()
+
+
+class BackgroundTaskTest(unittest.TestCase):
+    def test_background_task_drops_handler_context(self):
+        @metrics.instrument("test_handler")
+        async def handler():
+            inside = await current_labels()
+            background = await metrics.background_task(current_labels())
+            return inside, background
+
+        inside, background = asyncio.run(handler())
+        self.assertEqual(inside[0], "test_handler")
+        self.assertEqual(background, (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+"""normalize_message: repeated letters collapse, digits nahi (warna "episode 1000" aur "episode 10" ek key)."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import normalize_message  # noqa: E402
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_repeated_letters_collapse(self):
+        self.assertEqual(normalize_message("Hiiiii!!"), normalize_message("hi"))
+
+    def test_digits_kept(self):
+        self.assertNotEqual(normalize_message("episode 1000"), normalize_message("episode 10"))
+        self.assertEqual(normalize_message("Season 222"), "season 222")
+
+
+if __name__ == "__main__":
+    unittest.main()
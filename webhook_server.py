@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""Webhook mode: ek async ASGI server (Starlette) jo Telegram updates seedha Application ki queue me daalta hai.
+
+Long-running host (Render, VPS): `python bot.py` ya `uvicorn --factory bot:asgi_app` (lifespan Application chalata hai).
+Serverless (vercel.json -> `bot.app`): lifespan na chale to Application pehli request pe start hota hai, aur
+updates response se pehle hi process hote hain (WEBHOOK_INLINE), kyunki response ke baad instance freeze ho jata hai.
+"""
+
+import asyncio
+import hmac
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+
+import metrics
+
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")  # public base URL, jaise https://dorebox-bot.onrender.com
+# Zaroori: iske bina koi bhi /telegram pe nakli update (jaise admin ka /broadcast) bhej sakta hai
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+# Har cold start pe setWebhook call na karna ho to "0" (URL pehle se set hai)
+WEBHOOK_SET_ON_START = os.environ.get("WEBHOOK_SET_ON_START", "1") == "1"
+# "1": update request ke andar hi process (serverless). Vercel pe default "1", baaki jagah queue ("0")
+WEBHOOK_INLINE = os.environ.get("WEBHOOK_INLINE", "1" if os.environ.get("VERCEL") else "0") == "1"
+# Telegram secret_token: 1-256 chars, sirf A-Z a-z 0-9 _ -
+SECRET_RE = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+HOME_TEXT = "DoreBox AI Bot Running (Balanced Vibe Mode)"
+
+
+class WebhookStats:
+    def __init__(self):
+        self.started_at = time.time()
+        self.received = 0
+        self.rejected = 0
+
+
+def create_app(application, readiness=None):
+    """Application ka lifecycle (initialize/start/stop) server ke lifespan ke saath chalta hai.
+
+    /healthz = process zinda hai (liveness), /readyz = updates le sakte hain (readiness).
+    `readiness()` baaki components (DB, indexes...) ki state ka dict deta hai, sirf report ke liye.
+    """
+    if not WEBHOOK_SECRET or not SECRET_RE.fullmatch(WEBHOOK_SECRET):
+        raise RuntimeError("WEBHOOK_SECRET set karo (1-256 chars: A-Z a-z 0-9 _ -), webhook mode iske bina nahi chalega")
+
+    # Polling mode me starlette ki zaroorat nahi, isliye import yahan
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, PlainTextResponse, Response
+    from starlette.routing import Route
+    from telegram import Update
+
+    stats = WebhookStats()
+    state = {"started": False, "webhook_task": None}
+    start_lock = asyncio.Lock()
+
+    async def set_webhook():
+        try:
+            await application.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            print("✅ Webhook set ho gaya!")
+        except Exception as e:
+            print(f"❌ setWebhook Error: {e}")
+
+    async def ensure_started():
+        """Application initialize + start, ek hi baar: lifespan pe, ya host lifespan na chalaye to pehli request pe."""
+        if state["started"]:
+            return
+        async with start_lock:
+            if state["started"]:
+                return
+            await application.initialize()
+            if application.post_init:
+                await application.post_init(application)
+            await application.start()
+            # setWebhook ka wait nahi karte, taaki server turant ready ho
+            if WEBHOOK_URL and WEBHOOK_SET_ON_START:
+                state["webhook_task"] = asyncio.create_task(set_webhook())
+            state["started"] = True
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        await ensure_started()
+        try:
+            yield
+        finally:
+            webhook_task = state["webhook_task"]
+            if webhook_task is not None and not webhook_task.done():
+                webhook_task.cancel()
+            await application.stop()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+            await application.shutdown()
+
+    async def telegram(request: Request):
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(token, WEBHOOK_SECRET):
+            stats.rejected += 1
+            return Response(status_code=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            stats.rejected += 1
+            return Response(status_code=400)
+        stats.received += 1
+        await ensure_started()
+        update = Update.de_json(data, application.bot)
+        if WEBHOOK_INLINE:
+            await application.process_update(update)
+        else:
+            # Sirf queue me daalo; processing Application ke concurrent_updates workers karte hain
+            await application.update_queue.put(update)
+        return Response()
+
+    async def home(_request):
+        return PlainTextResponse(HOME_TEXT)
+
+    async def healthz(_request):
+        return JSONResponse({"status": "ok", "uptime": round(time.time() - stats.started_at, 1)})
+
+    async def readyz(_request):
+        # Lifespan na chala ho (serverless) to readiness probe hi instance ko start/warm karta hai
+        try:
+            await ensure_started()
+        except Exception as e:
+            return JSONResponse({"status": "starting", "running": False, "error": str(e)}, status_code=503)
+        body = {"status": "ready" if application.running else "starting", "running": application.running}
+        if readiness is not None:
+            body.update(readiness())
+        return JSONResponse(body, status_code=200 if application.running else 503)
+
+    async def metrics_endpoint(_request):
+        lines = [
+            "# TYPE dorebox_webhook_updates_received_total counter",
+            f"dorebox_webhook_updates_received_total {stats.received}",
+            "# TYPE dorebox_webhook_updates_rejected_total counter",
+            f"dorebox_webhook_updates_rejected_total {stats.rejected}",
+        ]
+        return PlainTextResponse("\n".join(lines) + "\n" + metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    return Starlette(
+        routes=[
+            Route(WEBHOOK_PATH, telegram, methods=["POST"]),
+            Route("/", home, methods=["GET"]),
+            Route("/healthz", healthz, methods=["GET"]),
+            Route("/readyz", readyz, methods=["GET"]),
+            Route("/metrics", metrics_endpoint, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def run(application, port, readiness=None):
+    import uvicorn
+
+    uvicorn.run(create_app(application, readiness), host="0.0.0.0", port=port, log_level="warning")